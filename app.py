@@ -1,29 +1,165 @@
-from flask import Flask, render_template_string, request, jsonify
-from apscheduler.schedulers.background import BackgroundScheduler
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired, ChallengeRequired
-import json
+from flask import Flask, Blueprint, Response, current_app, request, jsonify
+from werkzeug.local import LocalProxy
+import atexit
+import hmac
 import random
-import time
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 import os
 import logging
 from dotenv import load_dotenv
+from jobs import JobManager
+from pacer import Pacer
+from storage import Database
+from ledger import FollowLedger
+from followers import FollowerSnapshot
+from stats import StatsCache
+from session import SessionStore
+from config_store import ConfigStore
+from matcher import KeywordMatcher
+from dm_cursors import DirectCursorStore
+from quotas import QuotaLedger
+from events import EventBus, format_event
+from ipc import BotServer, RemoteBot
+from breaker import CircuitBreaker, GuardedClient, is_fatal
+from user_ids import UserIdCache, normalize_username
+from checkpoints import BatchCheckpoints
+from profiling import MemoryTracker, Profiler
+from engagements import EngagementIndex, MEDIA_TTL, STORY_TTL
+import metrics
+from logs import setup_logging, stop_logging
 
 # بارگذاری تنظیمات محیطی
 load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = 'instagram-bot-secret-key-2024'
+log = logging.getLogger(__name__)
+
+bp = Blueprint('bot', __name__)
+
+DEFAULT_CONFIG = {
+    "instagram_credentials": {
+        "username": "",
+        "password": ""
+    },
+    "target_accounts": ["instagram", "natgeo", "nike", "adidas"],
+    "daily_follow_limit": 50,
+    "daily_unfollow_limit": 50,
+    "daily_comment_limit": 30,
+    "unfollow_after_days": 2,
+    # چند ثانیه آمار حساب از کش داده شود تا دوباره از اینستاگرام گرفته شود
+    "stats_ttl": 300,
+    "comments": [
+        "👏 عالی بود!", "🔥 واقعا حرفه‌ای", "💫 فوق العاده است",
+        "❤️ عاشق این محتوایم", "👍 کارت درسته", "🌟 درخشیدی",
+        "😍 زیبا", "🎯 دقیق", "💯 درصد"
+    ],
+    "story_replies": [
+        "👌 عالی", "🔥🔥", "💯", "❤️❤️", "👍👍", "😍😍"
+    ],
+    "direct_message_responses": {
+        "سلام": "🙏 سلام! چطور می‌تونم کمک کنم؟",
+        "قیمت": "💵 لطفا به پیوی اصلی پیام بدید",
+        "همکاری": "🤝 برای همکاری در پیوی اصلی در ارتباط باشید",
+        "ممنون": "❤️ چشم، خوشحالم که راضی هستید"
+    },
+    "working_hours": {
+        "start": "09:00",
+        "end": "21:00"
+    }
+}
+
+# شناسه ثابت هر کار خودکار: (متد ربات، نوع trigger، زمان‌بندی)
+SCHEDULED_JOBS = {
+    # فالو روزانه - ساعت ۱۰ صبح
+    "daily_follow": ("daily_follow_task", "cron", {"hour": 10, "minute": 0}),
+    # آنفالو روزانه - ساعت ۱۸ عصر
+    "daily_unfollow": ("daily_unfollow_task", "cron", {"hour": 18, "minute": 0}),
+    # کامنت روزانه - ساعت ۱۴
+    "daily_comment": ("daily_comment_task", "cron", {"hour": 14, "minute": 0}),
+    # پاسخ به استوری‌ها - هر ۴ ساعت
+    "reply_stories": ("reply_to_stories_task", "interval", {"hours": 4}),
+}
 
 class AdvancedInstagramBot:
-    def __init__(self):
-        self.client = Client()
+    def __init__(self, clock=None, db_path='bot.db', client=None):
+        # instagrapi و apscheduler سنگین هستند و فقط هنگام ساخت ربات وارد می‌شوند
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
+        from scheduling import SQLiteJobStore, set_handler
+        
+        self._client = None
+        self.pacer = Pacer(clock)
+        # backoff گام‌ها به pacer yield می‌شود؛ فراخوانی هم‌زمان روی نخ pacer (یا با
+        # ساعت مجازی) بدون sleep و تکرار شکست می‌خورد
+        self.breaker = CircuitBreaker(
+            clock=self.pacer.clock.time,
+            can_sleep=lambda: not self.pacer.virtual and threading.current_thread() is not self.pacer.worker,
+            on_trip=self.on_breaker_trip
+        )
+        if client is not None:
+            self.client = client
         self.is_logged_in = False
-        self.followed_users = {}
-        self.scheduler = BackgroundScheduler()
-        self.setup_proxy()
+        self.db = Database(db_path)
+        self.session_store = SessionStore('session.json')
+        self.followed_users = FollowLedger(self.db)
+        self.dm_cursors = DirectCursorStore(self.db)
+        # کارها در bot.db می‌مانند؛ اجراهای جامانده بعد از قطعی یک بار (تا یک ساعت بعد) اجرا می‌شوند
+        self.scheduler = BackgroundScheduler(
+            jobstores={"default": SQLiteJobStore(self.db)},
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 3600}
+        )
+        set_handler(self.run_scheduled_task)
+        self.scheduler.add_listener(self.on_scheduler_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        self.jobs = JobManager(self.pacer, max_workers=2)
+        self.follower_snapshot = FollowerSnapshot(
+            lambda: self.client.user_followers(self.client.user_id, amount=0),
+            ttl=3600,
+            clock=self.pacer.clock.now
+        )
+        # ttl با تنظیم stats_ttl در on_config_changed تعیین می‌شود
+        self.stats_cache = StatsCache(lambda: self.client.account_info())
+        self.followed_users.subscribe(self.stats_cache.invalidate_local)
+        
+        # رویدادهای کارها و تغییرات آمار برای /events
+        self.events = EventBus()
+        self.published_stats = {}
+        self.stats_timer = None
+        self.stats_timer_lock = threading.Lock()
+        self.jobs.subscribe(self.on_job_event)
+        self.followed_users.subscribe(self.stats_changed)
+        self.stats_cache.subscribe(self.stats_changed)
+        self.user_ids = UserIdCache(self.db, lambda username: self.client.user_id_from_username(username))
         self.load_config()
+        self.quotas = QuotaLedger(
+            self.db,
+            lambda action: int(self.config[f"daily_{action}_limit"]),
+            clock=self.pacer.clock.time
+        )
+        # استوری‌ها و پست‌هایی که قبلا پاسخ یا کامنت گرفته‌اند
+        self.engagements = EngagementIndex(self.db, clock=self.pacer.clock.time)
+        # برنامه و پیشرفت دسته‌های فالو و آنفالو برای ادامه بعد از ری‌استارت
+        self.checkpoints = BatchCheckpoints(
+            self.db, clock=self.pacer.clock.time, write_lock=self.followed_users.write_lock
+        )
+        
+        metrics.LEDGER_SIZE.set_function(lambda: len(self.followed_users))
+        metrics.JOB_QUEUE_DEPTH.set_function(self.jobs.queue_depth)
+        metrics.JOBS_RUNNING.set_function(self.jobs.running)
+        metrics.PACER_PENDING.set_function(self.pacer.pending)
+    
+    @property
+    def client(self):
+        """کلاینت instagrapi که در اولین استفاده ساخته می‌شود"""
+        if self._client is None:
+            from instagrapi import Client
+            self.client = Client()
+            self.setup_proxy()
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        # همه فراخوانی‌های کلاینت برای /metrics اندازه گرفته می‌شوند و از مدار رد می‌شوند
+        self._client = GuardedClient(metrics.InstrumentedClient(client), self.breaker)
         
     def setup_proxy(self):
         """تنظیم پروکسی برای ایران"""
@@ -34,180 +170,316 @@ class AdvancedInstagramBot:
         }
         try:
             self.client.set_proxy(proxy_settings["https"])
-            print("✅ پروکسی تنظیم شد")
+            log.info("✅ پروکسی تنظیم شد")
         except:
-            print("⚠️ استفاده بدون پروکسی")
+            log.warning("⚠️ استفاده بدون پروکسی")
     
     def load_config(self):
-        try:
-            with open('config.json', 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        except:
-            self.config = {
-                "instagram_credentials": {
-                    "username": "",
-                    "password": ""
-                },
-                "target_accounts": ["instagram", "natgeo", "nike", "adidas"],
-                "daily_follow_limit": 50,
-                "daily_unfollow_limit": 50,
-                "daily_comment_limit": 30,
-                "unfollow_after_days": 2,
-                "comments": [
-                    "👏 عالی بود!", "🔥 واقعا حرفه‌ای", "💫 فوق العاده است",
-                    "❤️ عاشق این محتوایم", "👍 کارت درسته", "🌟 درخشیدی",
-                    "😍 زیبا", "🎯 دقیق", "💯 درصد"
-                ],
-                "story_replies": [
-                    "👌 عالی", "🔥🔥", "💯", "❤️❤️", "👍👍", "😍😍"
-                ],
-                "direct_message_responses": {
-                    "سلام": "🙏 سلام! چطور می‌تونم کمک کنم؟",
-                    "قیمت": "💵 لطفا به پیوی اصلی پیام بدید",
-                    "همکاری": "🤝 برای همکاری در پیوی اصلی در ارتباط باشید",
-                    "ممنون": "❤️ چشم، خوشحالم که راضی هستید"
-                },
-                "working_hours": {
-                    "start": "09:00",
-                    "end": "21:00"
-                }
-            }
-            self.save_config()
+        self.config_store = ConfigStore('config.json', DEFAULT_CONFIG)
+        self.config_store.subscribe(self.on_config_changed)
     
-    def save_config(self):
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=4)
+    def on_config_changed(self, snapshot):
+        """ساخت دوباره ساختارهای وابسته به تنظیمات، یک بار برای هر نسخه"""
+        self.dm_matcher = KeywordMatcher(snapshot["direct_message_responses"])
+        self.stats_cache.ttl = float(snapshot["stats_ttl"])
+        if self.is_logged_in:
+            self.user_ids.warm(snapshot["target_accounts"])
+    
+    @property
+    def config(self):
+        """آخرین snapshot تنظیمات؛ خواندن آن قفل لازم ندارد"""
+        return self.config_store.snapshot
+    
+    def now(self):
+        """زمان فعلی از ساعت pacer (در حالت ساعت مجازی، زمان شبیه‌سازی شده)"""
+        return datetime.fromtimestamp(self.pacer.clock.time())
     
     def login(self, username, password):
+        from instagrapi.exceptions import ChallengeRequired
+        
+        # نشست فعلی اگر ورود جدید شکست بخورد برگردانده می‌شود
+        previous = self.client.get_settings() if self.is_logged_in else None
         try:
-            print(f"🔐 تلاش برای ورود با کاربری: {username}")
+            log.info(f"🔐 تلاش برای ورود با کاربری: {username}")
             
-            # ذخیره اطلاعات برای استفاده بعدی
-            self.config["instagram_credentials"]["username"] = username
-            self.config["instagram_credentials"]["password"] = password
-            self.save_config()
+            # ورود دوباره همان راه بستن مدار باز شده با خطای احراز هویت است
+            if self.breaker.reason == "auth":
+                self.breaker.reset()
+            
+            # رمز همیشه بررسی می‌شود؛ از نشست ذخیره شده فقط شناسه دستگاه
+            # برداشته می‌شود تا اینستاگرام ورود را دستگاه جدید نبیند
+            saved = self.session_store.load()
+            same_user = saved and saved.get("username") == username
+            self.clear_session(saved["settings"].get("uuids") if same_user else None)
             
             # ورود به اینستاگرام
             self.client.login(username, password)
-            self.is_logged_in = True
+            self.session_store.save(username, self.client.get_settings())
             
-            # شروع سرویس‌های زمان‌بندی شده
-            self.start_scheduled_services()
+            # اطلاعات فقط بعد از ورود موفق برای ورود خودکار بعدی ذخیره می‌شود
+            self.config_store.update(instagram_credentials={"username": username, "password": password})
+            self.on_logged_in()
             
-            print("✅ ورود موفقیت‌آمیز بود")
+            log.info("✅ ورود موفقیت‌آمیز بود")
             return True
             
         except ChallengeRequired:
-            print("🔐 نیاز به تأیید هویت - لطفا از طریق اپ اینستاگرام تأیید کنید")
+            log.warning("🔐 نیاز به تأیید هویت - لطفا از طریق اپ اینستاگرام تأیید کنید")
+        except Exception as e:
+            log.error(f"❌ خطا در ورود: {str(e)}")
+        if previous is not None:
+            self.client.set_settings(previous)
+        return False
+    
+    def clear_session(self, uuids=None):
+        """پاک کردن نشست کلاینت و نگه داشتن فقط شناسه دستگاه (uuids)
+
+        set_settings({}) کوکی‌ها را پاک نمی‌کند (init فقط با کلید cookies آنها را
+        جایگزین می‌کند) و با ds_user_id مانده client.login بدون هیچ درخواستی و
+        بدون بررسی رمز True برمی‌گرداند.
+        """
+        self.client.set_settings({"cookies": {}})
+        if uuids:
+            self.client.set_uuids(uuids)
+    
+    def restore_session(self):
+        """بازیابی نشست ذخیره شده با یک درخواست سبک برای بررسی اعتبار آن"""
+        from instagrapi.exceptions import LoginRequired, ChallengeRequired
+        
+        saved = self.session_store.load()
+        if not saved:
+            return False
+        
+        try:
+            self.client.set_settings(saved["settings"])
+            self.client.account_info()
+        except (LoginRequired, ChallengeRequired):
+            log.warning("⚠️ نشست ذخیره شده معتبر نیست - ورود کامل لازم است")
+            self.session_store.clear()
+            self.clear_session(saved["settings"].get("uuids"))
             return False
         except Exception as e:
-            print(f"❌ خطا در ورود: {str(e)}")
+            log.warning(f"⚠️ بررسی نشست ذخیره شده ممکن نشد: {str(e)}")
             return False
+        
+        self.on_logged_in()
+        log.info(f"✅ نشست ذخیره شده {saved.get('username')} بازیابی شد")
+        return True
+    
+    def resume(self):
+        """هنگام راه‌اندازی: بازیابی نشست و در صورت رد شدن، ورود کامل با اطلاعات ذخیره شده"""
+        if self.restore_session():
+            return True
+        
+        credentials = self.config["instagram_credentials"]
+        if credentials["username"] and credentials["password"] and self.session_store.load() is None:
+            return self.login(credentials["username"], credentials["password"])
+        return False
+    
+    def on_logged_in(self):
+        self.is_logged_in = True
+        self.breaker.reset()
+        # آمار حساب جدید در پس‌زمینه گرفته می‌شود
+        self.stats_cache.clear()
+        self.stats_cache.get_account()
+        # مجموعه فالوورها مال اکانت قبلی است
+        self.follower_snapshot.invalidate()
+        self.user_ids.warm(self.config["target_accounts"])
+        
+        # شروع سرویس‌های زمان‌بندی شده
+        self.start_scheduled_services()
+        self.stats_changed()
+    
+    def on_breaker_trip(self, reason):
+        """نشست منقضی شده یا چالش: تا ورود دوباره هیچ کاری اجرا نمی‌شود"""
+        if reason == "auth":
+            self.is_logged_in = False
+            log.warning("🔐 نشست اینستاگرام معتبر نیست - لطفاً دوباره وارد شوید")
+        self.stats_changed()
+    
+    def on_scheduler_event(self, event):
+        from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+        
+        outcome = {EVENT_JOB_EXECUTED: "executed", EVENT_JOB_ERROR: "error"}.get(event.code, "missed")
+        metrics.SCHEDULER_RUNS.inc(job=event.job_id, outcome=outcome)
     
     def start_scheduled_services(self):
-        """شروع سرویس‌های زمان‌بندی شده"""
-        if not self.scheduler.running:
-            self.scheduler.start()
-            
-            # فالو روزانه - ساعت ۱۰ صبح
-            self.scheduler.add_job(
-                self.daily_follow_task,
-                'cron',
-                hour=10,
-                minute=0
-            )
-            
-            # آنفالو روزانه - ساعت ۱۸ عصر
-            self.scheduler.add_job(
-                self.daily_unfollow_task,
-                'cron',
-                hour=18,
-                minute=0
-            )
-            
-            # کامنت روزانه - ساعت ۱۴
-            self.scheduler.add_job(
-                self.daily_comment_task,
-                'cron',
-                hour=14,
-                minute=0
-            )
-            
-            # پاسخ به استوری‌ها - هر ۴ ساعت
+        """شروع یا ادامه سرویس‌های زمان‌بندی شده
+
+        کارهای ذخیره شده با همان شناسه نگه داشته می‌شوند تا زمان اجرای بعدی
+        بعد از ری‌استارت از دست نرود؛ فقط کارهای جدید یا تغییر کرده دوباره
+        ثبت و کارهای قدیمی حذف می‌شوند.
+        """
+        from apscheduler.schedulers.base import STATE_PAUSED, STATE_STOPPED
+        from apscheduler.triggers.cron import CronTrigger
+        from apscheduler.triggers.interval import IntervalTrigger
+        
+        if self.scheduler.state == STATE_PAUSED:
+            self.scheduler.resume()
+            self.stats_changed()
+            log.info("▶️ سرویس‌های زمان‌بندی شده ادامه یافتند")
+            return
+        if self.scheduler.state != STATE_STOPPED:
+            return
+        
+        self.scheduler.start(paused=True)
+        for job in self.scheduler.get_jobs():
+            if job.id not in SCHEDULED_JOBS:
+                job.remove()
+        
+        for job_id, (_, kind, fields) in SCHEDULED_JOBS.items():
+            trigger = CronTrigger(**fields) if kind == "cron" else IntervalTrigger(**fields)
+            existing = self.scheduler.get_job(job_id)
+            if existing is not None and str(existing.trigger) == str(trigger):
+                continue
             self.scheduler.add_job(
-                self.reply_to_stories_task,
-                'interval',
-                hours=4
+                "scheduling:run_task",
+                trigger,
+                args=[job_id],
+                id=job_id,
+                name=job_id,
+                replace_existing=True
             )
-            
-            print("✅ سرویس‌های زمان‌بندی شده شروع شدند")
+        
+        self.scheduler.resume()
+        self.stats_changed()
+        log.info("✅ سرویس‌های زمان‌بندی شده شروع شدند")
+    
+    def pause_scheduled_services(self):
+        """توقف موقت زمان‌بندی بدون shutdown تا /start_auto دوباره کار کند"""
+        from apscheduler.schedulers.base import STATE_RUNNING
+        
+        if self.scheduler.state != STATE_RUNNING:
+            return False
+        self.scheduler.pause()
+        self.stats_changed()
+        log.info("⏸ سرویس‌های زمان‌بندی شده متوقف شدند")
+        return True
+    
+    def run_scheduled_task(self, job_id):
+        """اجرای یک کار زمان‌بندی شده؛ ساعات کاری یک بار برای هر اجرا بررسی می‌شود"""
+        from scheduling import within_hours
+        
+        working_hours = self.config["working_hours"]
+        if not within_hours(self.now(), working_hours["start"], working_hours["end"]):
+            log.info(f"🌙 {job_id} خارج از ساعات کاری اجرا نشد", extra={"task": job_id})
+            return
+        
+        # اجرای قبلی هنوز در صف یا در حال اجراست
+        if self.jobs.active(job_id):
+            log.info(f"⏭ {job_id} هنوز در حال اجراست؛ این نوبت رد شد", extra={"task": job_id})
+            return
+        
+        getattr(self, SCHEDULED_JOBS[job_id][0])()
     
     def daily_follow_task(self):
         """کار فالو روزانه"""
         if not self.is_logged_in:
             return
         
-        print("🔄 شروع فالو روزانه...")
+        if not self.quotas.remaining("follow"):
+            log.info("⏸ سهمیه فالو ۲۴ ساعت گذشته تمام شده است")
+            return
+        
+        log.info("🔄 شروع فالو روزانه...")
         target_account = random.choice(self.config["target_accounts"])
-        self.follow_users_from_target(target_account, 10)
+        self.jobs.submit("daily_follow", self.follow_users_from_target_steps, target_username=target_account, count=10)
     
     def daily_unfollow_task(self):
         """کار آنفالو روزانه"""
         if not self.is_logged_in:
             return
         
-        print("🔄 شروع آنفالو روزانه...")
-        self.check_and_unfollow()
+        if not self.quotas.remaining("unfollow"):
+            log.info("⏸ سهمیه آنفالو ۲۴ ساعت گذشته تمام شده است")
+            return
+        
+        log.info("🔄 شروع آنفالو روزانه...")
+        self.jobs.submit("daily_unfollow", self.check_and_unfollow_steps)
     
     def daily_comment_task(self):
         """کار کامنت روزانه"""
         if not self.is_logged_in:
             return
         
-        print("🔄 شروع کامنت روزانه...")
+        if not self.quotas.remaining("comment"):
+            log.info("⏸ سهمیه کامنت ۲۴ ساعت گذشته تمام شده است")
+            return
+        
+        log.info("🔄 شروع کامنت روزانه...")
         target_account = random.choice(self.config["target_accounts"])
-        self.comment_on_target_posts(target_account, 5)
+        self.jobs.submit("daily_comment", self.comment_on_target_posts_steps, target_username=target_account, count=5)
     
     def reply_to_stories_task(self):
         """پاسخ به استوری‌ها"""
         if not self.is_logged_in:
             return
         
-        print("📖 بررسی استوری‌ها برای پاسخ...")
-        self.reply_to_followers_stories(3)
+        log.info("📖 بررسی استوری‌ها برای پاسخ...")
+        self.jobs.submit("reply_stories", self.reply_to_followers_stories_steps, count=3)
     
-    def follow_users_from_target(self, target_username, count=10):
+    def follow_users_from_target(self, target_username, count=10, progress=None):
         """فالو کاربران از یک اکانت هدف"""
+        return self.pacer.run(self.follow_users_from_target_steps(target_username, count, progress))
+    
+    def follow_users_from_target_steps(self, target_username, count=10, progress=None):
+        """گام‌های فالو؛ به جای sleep تأخیر بعدی را yield می‌کند"""
         if not self.is_logged_in:
             return {"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"}
         
+        # دسته نیمه‌کاره قبلی همین هدف از جای توقف ادامه می‌یابد
+        checkpoint = self.checkpoints.open(f"follow:{normalize_username(target_username)}")
+        if checkpoint is None:
+            return {"status": "error", "message": f"❌ فالو از {target_username} در حال اجراست"}
+        
+        # سهمیه قبل از هر درخواست به اینستاگرام رزرو می‌شود
+        quota = self.quotas.reserve("follow", len(checkpoint.remaining) if checkpoint.resumed else count)
+        if not quota.granted:
+            checkpoint.close()
+            return {"status": "error", "message": "❌ سهمیه فالو ۲۴ ساعت گذشته تمام شده است"}
+        count = quota.granted
+        
         try:
-            user_id = self.client.user_id_from_username(target_username)
-            followers = self.client.user_followers(user_id, amount=count)
+            if checkpoint.resumed:
+                log.info(f"▶️ ادامه فالو از {target_username} از {checkpoint.cursor}/{len(checkpoint.plan)}")
+            else:
+                user_id = self.user_ids.get(target_username)
+                followers = yield from self.client.paced.user_followers(user_id, amount=count)
+                checkpoint.start([[user.pk, user.username] for user in list(followers.values())[:count]])
             
+            users = checkpoint.remaining[:count]
             followed_count = 0
-            for user in list(followers.values())[:count]:
+            for index, (user_pk, username) in enumerate(users):
+                if progress:
+                    progress(index, len(users))
                 try:
-                    self.client.user_follow(user.pk)
+                    yield from self.client.paced.user_follow(user_pk)
+                    quota.consume()
                     
-                    self.followed_users[user.pk] = {
-                        "username": user.username,
-                        "follow_date": datetime.now().isoformat(),
-                        "source_account": target_username,
-                        "followed_back": False
-                    }
+                    with checkpoint.step():
+                        self.followed_users[user_pk] = {
+                            "username": username,
+                            "follow_date": self.now().isoformat(),
+                            "source_account": target_username,
+                            "followed_back": False
+                        }
                     followed_count += 1
                     
-                    print(f"✅ فالو شد: {user.username}")
+                    log.info(f"✅ فالو شد: {username}", extra={"target": username})
                     
                     # تاخیر تصادفی بین ۲۰-۴۰ ثانیه
-                    time.sleep(random.uniform(20, 40))
+                    yield random.uniform(20, 40)
                     
                 except Exception as e:
-                    print(f"⚠️ خطا در فالو {user.username}: {str(e)}")
+                    # خطای احراز هویت یا محدودیت نرخ کل دسته را متوقف می‌کند
+                    if is_fatal(e):
+                        raise
+                    log.warning(f"⚠️ خطا در فالو {username}: {str(e)}", extra={"target": username, "error": type(e).__name__})
+                    checkpoint.advance()
                     continue
             
-            self.save_followed_users()
+            if progress:
+                progress(len(users), len(users))
             
             return {
                 "status": "success", 
@@ -216,195 +488,439 @@ class AdvancedInstagramBot:
             }
             
         except Exception as e:
+            # pk کش شده ممکن است دیگر معتبر نباشد
+            if not is_fatal(e):
+                self.user_ids.invalidate(target_username)
             return {"status": "error", "message": f"❌ خطا در فالو: {str(e)}"}
+        finally:
+            quota.release()
+            checkpoint.close()
     
-    def check_and_unfollow(self):
+    def check_and_unfollow(self, progress=None):
         """بررسی و آنفالو کاربرانی که فالو بک نکرده‌اند"""
+        return self.pacer.run(self.check_and_unfollow_steps(progress))
+    
+    def check_and_unfollow_steps(self, progress=None):
+        """گام‌های آنفالو؛ به جای sleep تأخیر بعدی را yield می‌کند"""
         if not self.is_logged_in:
             return {"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"}
         
+        checkpoint = self.checkpoints.open("unfollow")
+        if checkpoint is None:
+            # کاربران سررسید را دسته در حال اجرا برداشته است
+            return {"status": "success", "unfollowed": 0, "message": "❌ آنفالو دیگری در حال اجراست"}
+        
         try:
             unfollow_count = 0
-            current_time = datetime.now()
+            due = []
+            if checkpoint.resumed:
+                log.info(f"▶️ ادامه آنفالو از {checkpoint.cursor}/{len(checkpoint.plan)}")
+            else:
+                # فقط کاربرانی که بیش از unfollow_after_days روز پیش فالو شده‌اند
+                cutoff = self.pacer.clock.time() - self.config["unfollow_after_days"] * 86400
+                due = self.followed_users.pop_due(cutoff)
+            quota = self.quotas.reserve("unfollow", len(checkpoint.remaining) if checkpoint.resumed else len(due))
+            if (due or checkpoint.remaining) and not quota.granted:
+                for user_id in due:
+                    self.followed_users.requeue(user_id)
+                return {"status": "error", "message": "❌ سهمیه آنفالو ۲۴ ساعت گذشته تمام شده است"}
             
-            for user_id, user_data in list(self.followed_users.items()):
-                follow_date = datetime.fromisoformat(user_data["follow_date"])
+            try:
+                if not checkpoint.resumed:
+                    # یک بار دریافت فالوورها به جای user_friendship برای هر کاربر؛
+                    # due فقط کاربرانی است که هنوز فالو بک نکرده‌اند
+                    followers = self.follower_snapshot.get() if due else frozenset()
+                    plan = []
+                    for user_id in due:
+                        user_data = self.followed_users.get(user_id)
+                        if user_data is None or user_data["followed_back"]:
+                            continue
+                        if user_id in followers:
+                            self.followed_users.set_fields(user_id, followed_back=True)
+                        else:
+                            plan.append(user_id)
+                    checkpoint.start(plan)
                 
-                # اگر ۲ روز گذشته و هنوز فالو بک نکرده
-                if (current_time - follow_date).days >= self.config["unfollow_after_days"]:
+                users = checkpoint.remaining
+                for index, user_id in enumerate(users):
+                    if progress:
+                        progress(index, len(users))
+                    # بقیه برنامه برای اجرای بعدی می‌ماند
+                    if not quota.remaining:
+                        break
+                    user_data = self.followed_users.get(user_id)
+                    
                     try:
-                        friendship = self.client.user_friendship(user_id)
+                        if user_data is None or user_data["followed_back"]:
+                            checkpoint.advance()
+                            continue
                         
-                        if not friendship.followed_by and not user_data["followed_back"]:
-                            self.client.user_unfollow(user_id)
+                        yield from self.client.paced.user_unfollow(user_id)
+                        quota.consume()
+                        with checkpoint.step():
                             del self.followed_users[user_id]
-                            unfollow_count += 1
-                            
-                            print(f"❌ آنفالو شد: {user_data['username']}")
-                            
-                            # تاخیر بین آنفالوها
-                            time.sleep(random.uniform(20, 40))
-                            
+                        unfollow_count += 1
+                        
+                        log.info(f"❌ آنفالو شد: {user_data['username']}", extra={"target": user_data['username']})
+                        
+                        # تاخیر بین آنفالوها
+                        yield random.uniform(20, 40)
+                        
                     except Exception as e:
-                        print(f"⚠️ خطا در بررسی {user_id}: {str(e)}")
+                        # خطای احراز هویت یا محدودیت نرخ کل دسته را متوقف می‌کند
+                        if is_fatal(e):
+                            raise
+                        log.warning(f"⚠️ خطا در بررسی {user_id}: {str(e)}", extra={"target": user_id, "error": type(e).__name__})
+                        checkpoint.advance()
                         continue
+            finally:
+                quota.release()
+                # کاربرانی که در دفتر مانده‌اند در اجرای بعدی دوباره بررسی می‌شوند
+                for user_id in due:
+                    self.followed_users.requeue(user_id)
             
-            self.save_followed_users()
+            if progress:
+                progress(len(users), len(users))
             
             return {
                 "status": "success", 
+                "unfollowed": unfollow_count,
                 "message": f"❌ {unfollow_count} نفر آنفالو شدند"
             }
             
         except Exception as e:
             return {"status": "error", "message": f"❌ خطا در آنفالو: {str(e)}"}
+        finally:
+            checkpoint.close()
     
-    def comment_on_target_posts(self, target_username, count=5):
+    def comment_on_target_posts(self, target_username, count=5, progress=None):
         """ارسال کامنت روی پست‌های اکانت هدف"""
+        return self.pacer.run(self.comment_on_target_posts_steps(target_username, count, progress))
+    
+    def comment_on_target_posts_steps(self, target_username, count=5, progress=None):
+        """گام‌های کامنت؛ به جای sleep تأخیر بعدی را yield می‌کند"""
         if not self.is_logged_in:
             return {"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"}
         
+        quota = self.quotas.reserve("comment", count)
+        if not quota.granted:
+            return {"status": "error", "message": "❌ سهمیه کامنت ۲۴ ساعت گذشته تمام شده است"}
+        count = quota.granted
+        
         try:
-            user_id = self.client.user_id_from_username(target_username)
-            medias = self.client.user_medias(user_id, amount=count)
+            user_id = self.user_ids.get(target_username)
+            medias = yield from self.client.paced.user_medias(user_id, amount=count)
+            medias = [media for media in medias[:count] if not self.engagements.seen("media", media.id)]
             
             commented_count = 0
-            for media in medias:
+            for index, media in enumerate(medias):
+                if progress:
+                    progress(index, len(medias))
                 try:
                     comment_text = random.choice(self.config["comments"])
-                    self.client.media_comment(media.id, comment_text)
+                    yield from self.client.paced.media_comment(media.id, comment_text)
+                    quota.consume()
+                    self.engagements.add("media", media.id, MEDIA_TTL)
                     commented_count += 1
                     
-                    print(f"💬 کامنت گذاشته شد روی پست {target_username}: {comment_text}")
+                    log.info(f"💬 کامنت گذاشته شد روی پست {target_username}: {comment_text}", extra={"target": media.id})
                     
-                    time.sleep(random.uniform(30, 60))
+                    yield random.uniform(30, 60)
                     
                 except Exception as e:
-                    print(f"⚠️ خطا در کامنت: {str(e)}")
+                    # خطای احراز هویت یا محدودیت نرخ کل دسته را متوقف می‌کند
+                    if is_fatal(e):
+                        raise
+                    log.warning(f"⚠️ خطا در کامنت: {str(e)}", extra={"target": media.id, "error": type(e).__name__})
                     continue
+            if progress:
+                progress(len(medias), len(medias))
+            self.engagements.prune()
             
             return {
                 "status": "success", 
+                "commented": commented_count,
                 "message": f"💬 {commented_count} کامنت روی پست‌های {target_username} گذاشته شد"
             }
             
         except Exception as e:
+            # pk کش شده ممکن است دیگر معتبر نباشد
+            if not is_fatal(e):
+                self.user_ids.invalidate(target_username)
             return {"status": "error", "message": f"❌ خطا در ارسال کامنت: {str(e)}"}
+        finally:
+            quota.release()
     
-    def reply_to_followers_stories(self, count=5):
+    def reply_to_followers_stories(self, count=5, progress=None):
         """پاسخ به استوری‌های فالوورها"""
+        return self.pacer.run(self.reply_to_followers_stories_steps(count, progress))
+    
+    def reply_to_followers_stories_steps(self, count=5, progress=None):
+        """گام‌های پاسخ به استوری؛ به جای sleep تأخیر بعدی را yield می‌کند"""
         if not self.is_logged_in:
             return {"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"}
         
         try:
             # دریافت فالوورها
-            user_info = self.client.account_info()
-            followers = self.client.user_followers(user_info.pk, amount=count)
+            user_info = yield from self.client.paced.account_info()
+            followers = yield from self.client.paced.user_followers(user_info.pk, amount=count)
             
+            # کاربری که در ۲۴ ساعت گذشته به استوری‌اش پاسخ داده شده دوباره گرفته نمی‌شود
+            users = [user for user in list(followers.values())[:count] if not self.engagements.seen("story_user", user.pk)]
             replied_count = 0
-            for user in list(followers.values())[:count]:
+            for index, user in enumerate(users):
+                if progress:
+                    progress(index, len(users))
                 try:
-                    stories = self.client.user_stories(user.pk)
+                    stories = yield from self.client.paced.user_stories(user.pk)
+                    stories = [story for story in stories if not self.engagements.seen("story", story.id)]
                     if stories:
                         story = stories[0]
                         reply_text = random.choice(self.config["story_replies"])
-                        self.client.story_react(story.id, reply_text)
+                        yield from self.client.paced.story_react(story.id, reply_text)
+                        self.engagements.add("story", story.id, STORY_TTL)
+                        self.engagements.add("story_user", user.pk, STORY_TTL)
                         replied_count += 1
                         
-                        print(f"📖 پاسخ به استوری {user.username}: {reply_text}")
+                        log.info(f"📖 پاسخ به استوری {user.username}: {reply_text}", extra={"target": user.username})
                         
-                        time.sleep(random.uniform(20, 40))
+                        yield random.uniform(20, 40)
                         
                 except Exception as e:
-                    print(f"⚠️ خطا در پاسخ به استوری: {str(e)}")
+                    # خطای احراز هویت یا محدودیت نرخ کل دسته را متوقف می‌کند
+                    if is_fatal(e):
+                        raise
+                    log.warning(f"⚠️ خطا در پاسخ به استوری: {str(e)}", extra={"target": user.username, "error": type(e).__name__})
                     continue
+            if progress:
+                progress(len(users), len(users))
+            self.engagements.prune()
             
             return {
                 "status": "success", 
+                "replied": replied_count,
                 "message": f"📖 به {replied_count} استوری پاسخ داده شد"
             }
             
         except Exception as e:
             return {"status": "error", "message": f"❌ خطا در پاسخ به استوری: {str(e)}"}
     
-    def auto_reply_direct_messages(self):
+    def auto_reply_direct_messages(self, progress=None):
         """پاسخ خودکار به پیام‌های مستقیم"""
+        return self.pacer.run(self.auto_reply_direct_messages_steps(progress))
+    
+    def auto_reply_direct_messages_steps(self, progress=None):
+        """گام‌های پاسخ به پیام؛ به جای sleep تأخیر بعدی را yield می‌کند"""
         if not self.is_logged_in:
             return {"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"}
         
         try:
-            threads = self.client.direct_threads(amount=10)
+            threads = yield from self.client.paced.direct_threads(amount=10)
             replied_count = 0
             
-            for thread in threads:
+            for index, thread in enumerate(threads):
+                if progress:
+                    progress(index, len(threads))
                 try:
                     last_message = thread.messages[0] if thread.messages else None
                     if last_message and last_message.user_id != self.client.user_id:
-                        message_text = last_message.text.lower()
+                        # پیامی که قبلا بررسی شده دوباره پاسخ نمی‌گیرد
+                        if not self.dm_cursors.is_new(thread.id, last_message):
+                            continue
                         
                         # پیدا کردن پاسخ مناسب
-                        response = None
-                        for keyword, reply in self.config["direct_message_responses"].items():
-                            if keyword in message_text:
-                                response = reply
-                                break
+                        response = self.dm_matcher.match(last_message.text)
                         
-                        if response:
-                            self.client.direct_send(response, thread_ids=[thread.id])
+                        if not response:
+                            self.dm_cursors.mark(thread.id, last_message)
+                        else:
+                            yield from self.client.paced.direct_send(response, thread_ids=[thread.id])
+                            self.dm_cursors.mark(thread.id, last_message)
                             replied_count += 1
-                            print(f"💌 پاسخ به پیام: {response}")
+                            log.info(f"💌 پاسخ به پیام: {response}", extra={"target": thread.id})
                             
-                            time.sleep(random.uniform(10, 20))
+                            yield random.uniform(10, 20)
                             
                 except Exception as e:
-                    print(f"⚠️ خطا در پاسخ به پیام: {str(e)}")
+                    # خطای احراز هویت یا محدودیت نرخ کل دسته را متوقف می‌کند
+                    if is_fatal(e):
+                        raise
+                    log.warning(f"⚠️ خطا در پاسخ به پیام: {str(e)}", extra={"target": thread.id, "error": type(e).__name__})
                     continue
+            if progress:
+                progress(len(threads), len(threads))
+            self.dm_cursors.prune()
             
             return {
                 "status": "success", 
+                "replied": replied_count,
                 "message": f"💌 به {replied_count} پیام پاسخ داده شد"
             }
             
         except Exception as e:
             return {"status": "error", "message": f"❌ خطا در پاسخ به پیام: {str(e)}"}
     
-    def save_followed_users(self):
-        with open('followed_users.json', 'w', encoding='utf-8') as f:
-            json.dump(self.followed_users, f, ensure_ascii=False, indent=4)
-    
     def load_followed_users(self):
-        try:
-            with open('followed_users.json', 'r', encoding='utf-8') as f:
-                self.followed_users = json.load(f)
-        except:
-            self.followed_users = {}
+        """انتقال یک‌باره followed_users.json قدیمی به دفتر فالوها"""
+        self.followed_users.migrate_json('followed_users.json')
+    
+    def local_stats(self):
+        """آمارهایی که از دفتر فالوها محاسبه می‌شوند"""
+        return {
+            "followed_count": len(self.followed_users)
+        }
+    
+    def on_job_event(self, event, job):
+        """ارسال وضعیت کار به /events؛ هر گام کار ممکن است آمار را هم تغییر دهد"""
+        if not self.events.has_subscribers():
+            return
+        self.events.publish("job", dict(job.to_dict(), event=event))
+        if event in ("progress", "finished"):
+            self.stats_changed()
+    
+    def stats_changed(self, *args):
+        """ارسال تغییرات آمار به /events؛ تغییرات پشت سر هم در نیم ثانیه یکی می‌شوند"""
+        if not self.events.has_subscribers():
+            return
+        with self.stats_timer_lock:
+            if self.stats_timer is not None:
+                return
+            self.stats_timer = threading.Timer(0.5, self.publish_stats)
+            self.stats_timer.daemon = True
+            self.stats_timer.start()
+    
+    def stats_snapshot(self):
+        """آمار کامل برای اتصال تازه؛ اولین آن مبنای تغییرات بعدی می‌شود"""
+        stats = self.get_stats()
+        if not self.published_stats:
+            self.published_stats = stats
+        return stats
+    
+    def publish_stats(self):
+        with self.stats_timer_lock:
+            self.stats_timer = None
+        stats = self.get_stats()
+        delta = {key: value for key, value in stats.items() if self.published_stats.get(key) != value}
+        self.published_stats = stats
+        if delta:
+            self.events.publish("stats", delta)
+    
+    def submit_job(self, name, method, **params):
+        """ثبت یکی از متدهای *_steps با نام آن در صف کارها (از routeها و workerها)"""
+        if not method.endswith("_steps"):
+            raise ValueError(f"unknown task method: {method}")
+        return self.jobs.submit(name, getattr(self, method), **params).to_dict()
+    
+    def quota_remaining(self, action):
+        return self.quotas.remaining(action)
+    
+    def get_config(self):
+        return self.config.to_dict()
+    
+    def update_config(self, changes):
+        self.config_store.update(changes)
+    
+    def list_jobs(self):
+        return self.jobs.list()
+    
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job is not None else None
+    
+    def render_metrics(self):
+        return metrics.registry.render()
+    
+    def set_job_profiling(self, name, enabled):
+        """روشن یا خاموش کردن پروفایل کار name (مثلا daily_follow یا follow)"""
+        if enabled:
+            profiler.jobs.add(name)
+        else:
+            profiler.jobs.discard(name)
+        self.jobs.profiler = profiler if profiler.jobs else None
+        return self.profiling_status()
+    
+    def profiling_status(self):
+        return {"jobs": sorted(profiler.jobs), "files": profiler.files()}
+    
+    def memory_control(self, action, frames=10):
+        """start، stop یا baseline برای tracemalloc پروسه ربات"""
+        if action == "start":
+            memory_tracker.start(frames)
+        elif action == "stop":
+            memory_tracker.stop()
+        elif action == "baseline":
+            memory_tracker.reset_baseline()
+        else:
+            raise ValueError(f"unknown memory action: {action}")
+        return memory_tracker.report(limit=0)
+    
+    def memory_report(self, limit=20, key_type='lineno'):
+        return memory_tracker.report(limit, key_type)
+    
+    def event_stream(self, last_event_id=None):
+        """بدنه /events: آمار کامل و بعد رویدادهای کار و تغییرات آمار"""
+        return self.events.stream(last_event_id, [format_event("stats", self.stats_snapshot())])
+    
+    def scheduler_running(self):
+        from apscheduler.schedulers.base import STATE_RUNNING
+        
+        return self.scheduler.state == STATE_RUNNING
     
     def get_stats(self):
-        following_count = 0
-        follower_count = 0
+        """آمار داشبورد از کش؛ اطلاعات حساب در پس‌زمینه به‌روز می‌شود"""
+        account = None
         if self.is_logged_in:
-            try:
-                user_info = self.client.account_info()
-                following_count = user_info.following_count
-                follower_count = user_info.follower_count
-                username = user_info.username
-            except:
-                username = "Unknown"
+            account = self.stats_cache.get_account()
+        local = self.stats_cache.get_local(self.local_stats)
+        
+        if not self.is_logged_in:
+            username = "Not logged in"
+        else:
+            username = account["username"] if account else "Unknown"
         
         return {
             "logged_in": self.is_logged_in,
-            "username": username if self.is_logged_in else "Not logged in",
-            "followed_count": len(self.followed_users),
-            "actual_following": following_count,
-            "follower_count": follower_count,
+            "username": username,
+            "followed_count": local["followed_count"],
+            "actual_following": account["following_count"] if account else 0,
+            "follower_count": account["follower_count"] if account else 0,
+            "stats_fetched_at": self.stats_cache.fetched_at_iso(),
+            "quotas": self.quotas.summary(("follow", "unfollow", "comment")),
+            "breaker": self.breaker.to_dict(),
             "target_accounts_count": len(self.config["target_accounts"]),
             "comments_count": len(self.config["comments"]),
-            "scheduler_running": self.scheduler.running if hasattr(self, 'scheduler') else False
+            "scheduler_running": self.scheduler_running()
         }
 
-# ایجاد نمونه ربات
-bot = AdvancedInstagramBot()
-bot.load_followed_users()
+# نمونه ربات در اولین استفاده ساخته می‌شود تا وب سرور بلافاصله بالا بیاید
+_bot = None
+_bot_lock = threading.Lock()
+
+def build_bot():
+    new_bot = AdvancedInstagramBot()
+    new_bot.load_followed_users()
+    new_bot.resume()
+    return new_bot
+
+def ipc_authkey():
+    key = os.getenv("BOT_IPC_KEY")
+    return key.encode() if key else None
+
+def get_bot():
+    """ربات این پروسه؛ با BOT_SOCKET (حالت worker) پراکسی پروسه مالک برگردانده می‌شود"""
+    global _bot
+    if _bot is None:
+        with _bot_lock:
+            if _bot is None:
+                socket_path = os.getenv("BOT_SOCKET")
+                _bot = RemoteBot(socket_path, ipc_authkey()) if socket_path else build_bot()
+    return _bot
+
+bot = LocalProxy(get_bot)
+
+# ابزارهای عیب‌یابی؛ تا از /debug روشن نشوند هزینه‌ای ندارند
+profiler = Profiler(os.getenv("PROFILE_DIR", "profiles"))
+memory_tracker = MemoryTracker()
 
 # HTML Template
 HTML_TEMPLATE = '''
@@ -583,7 +1099,6 @@ HTML_TEMPLATE = '''
             
             const result = await response.json();
             showResult(result.message, result.status);
-            loadStats();
             loadSettings();
         }
 
@@ -597,9 +1112,7 @@ HTML_TEMPLATE = '''
                 body: JSON.stringify({target_account: targetAccount, count: parseInt(count)})
             });
             
-            const result = await response.json();
-            showResult(result.message, result.status);
-            loadStats();
+            handleJob(await response.json());
         }
 
         async function postComments() {
@@ -612,27 +1125,58 @@ HTML_TEMPLATE = '''
                 body: JSON.stringify({target_account: targetAccount, count: parseInt(count)})
             });
             
-            const result = await response.json();
-            showResult(result.message, result.status);
+            handleJob(await response.json());
         }
 
         async function replyToStories() {
             const response = await fetch('/reply_stories', {method: 'POST'});
-            const result = await response.json();
-            showResult(result.message, result.status);
+            handleJob(await response.json());
         }
 
         async function checkUnfollow() {
             const response = await fetch('/unfollow', {method: 'POST'});
-            const result = await response.json();
-            showResult(result.message, result.status);
-            loadStats();
+            handleJob(await response.json());
         }
 
         async function replyToMessages() {
             const response = await fetch('/reply_messages', {method: 'POST'});
-            const result = await response.json();
+            handleJob(await response.json());
+        }
+
+        // کارهایی که از این صفحه شروع شده‌اند؛ نتیجه از /events می‌رسد
+        const pendingJobs = new Set();
+
+        function handleJob(result) {
             showResult(result.message, result.status);
+            if (result.job_id) pendingJobs.add(result.job_id);
+        }
+
+        function onJobEvent(job) {
+            if (!pendingJobs.has(job.id)) return;
+            if (job.event === 'progress') {
+                showProgress(job);
+                return;
+            }
+            if (job.event !== 'finished') return;
+            
+            pendingJobs.delete(job.id);
+            document.getElementById('job-' + job.id)?.remove();
+            if (job.state === 'finished' && job.result) {
+                showResult(job.result.message, job.result.status);
+            } else {
+                showResult(job.error, 'error');
+            }
+        }
+
+        function showProgress(job) {
+            let div = document.getElementById('job-' + job.id);
+            if (!div) {
+                div = document.createElement('div');
+                div.id = 'job-' + job.id;
+                div.className = 'alert success';
+                document.getElementById('results').appendChild(div);
+            }
+            div.textContent = `⏳ ${job.name}: ${job.progress.done}/${job.progress.total}`;
         }
 
         async function startAutoServices() {
@@ -668,10 +1212,10 @@ HTML_TEMPLATE = '''
             showResult(result.message, result.status);
         }
 
-        async function loadStats() {
-            const response = await fetch('/stats');
-            const stats = await response.json();
-            
+        // آمار کامل هنگام اتصال و بعد فقط فیلدهای تغییر کرده می‌رسد
+        const stats = {};
+
+        function renderStats() {
             document.getElementById('stats').innerHTML = `
                 <div class="stat-card">
                     <div style="font-size: 24px;">${stats.logged_in ? '✅' : '❌'}</div>
@@ -693,6 +1237,14 @@ HTML_TEMPLATE = '''
                     <div style="font-size: 24px;">${stats.scheduler_running ? '✅' : '❌'}</div>
                     <div>سرویس خودکار</div>
                 </div>
+                <div class="stat-card">
+                    <div style="font-size: 24px;">${stats.stats_fetched_at ? new Date(stats.stats_fetched_at).toLocaleTimeString('fa-IR') : '-'}</div>
+                    <div>آخرین به‌روزرسانی</div>
+                </div>
+                <div class="stat-card">
+                    <div style="font-size: 24px;">${!stats.breaker || stats.breaker.state === 'closed' ? '✅' : '⛔ ' + stats.breaker.reason}</div>
+                    <div>ارتباط با اینستاگرام</div>
+                </div>
             `;
         }
 
@@ -715,18 +1267,27 @@ HTML_TEMPLATE = '''
             setTimeout(() => div.remove(), 5000);
         }
 
-        // بارگذاری اولیه
-        loadStats();
+        function connectEvents() {
+            const source = new EventSource('/events');
+            source.addEventListener('stats', event => {
+                Object.assign(stats, JSON.parse(event.data));
+                renderStats();
+            });
+            source.addEventListener('job', event => onJobEvent(JSON.parse(event.data)));
+        }
+
+        // اتصال به جریان رویدادها (مرورگر بعد از قطع شدن خودش دوباره وصل می‌شود)
+        connectEvents();
     </script>
 </body>
 </html>
 '''
 
-@app.route('/')
+@bp.route('/')
 def home():
     return HTML_TEMPLATE
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
     username = data.get('username', '')
@@ -737,46 +1298,87 @@ def login():
     else:
         return jsonify({"status": "error", "message": "❌ خطا در ورود - اطلاعات را بررسی کنید"})
 
-@app.route('/follow', methods=['POST'])
+def enqueue(name, method, quota=None, **params):
+    """ثبت عملیات در صف کارها و پاسخ فوری با شناسه کار
+
+    count باید عدد صحیح مثبت باشد. اگر quota داده شود، درخواست بدون سهمیه
+    باقی‌مانده رد و count به اندازه سهمیه کوتاه می‌شود.
+    """
+    if not bot.is_logged_in:
+        return jsonify({"status": "error", "message": "❌ لطفاً اول وارد حساب کاربری شوید"})
+    
+    if "count" in params:
+        try:
+            params["count"] = int(params["count"])
+        except (TypeError, ValueError):
+            params["count"] = 0
+        if params["count"] <= 0:
+            return jsonify({"status": "error", "message": "❌ count باید عدد صحیح مثبت باشد"}), 400
+    
+    if quota is not None:
+        remaining = bot.quota_remaining(quota)
+        if not remaining:
+            return jsonify({
+                "status": "error",
+                "remaining": 0,
+                "message": "❌ سهمیه ۲۴ ساعت گذشته برای این عملیات تمام شده است"
+            }), 429
+        if "count" in params:
+            params["count"] = min(params["count"], remaining)
+    
+    job = bot.submit_job(name, method, **params)
+    return jsonify({
+        "status": "success",
+        "job_id": job["id"],
+        "message": "⏳ عملیات در صف قرار گرفت"
+    }), 202
+
+@bp.route('/follow', methods=['POST'])
 def follow():
     data = request.get_json()
     target_account = data.get('target_account', 'random')
     count = data.get('count', 10)
     
     if target_account == 'random':
-        target_account = random.choice(bot.config["target_accounts"])
+        target_account = random.choice(bot.get_config()["target_accounts"])
     
-    result = bot.follow_users_from_target(target_account, count)
-    return jsonify(result)
+    return enqueue("follow", "follow_users_from_target_steps", quota="follow", target_username=target_account, count=count)
 
-@app.route('/comment', methods=['POST'])
+@bp.route('/comment', methods=['POST'])
 def comment():
     data = request.get_json()
     target_account = data.get('target_account', 'random')
     count = data.get('count', 5)
     
     if target_account == 'random':
-        target_account = random.choice(bot.config["target_accounts"])
+        target_account = random.choice(bot.get_config()["target_accounts"])
     
-    result = bot.comment_on_target_posts(target_account, count)
-    return jsonify(result)
+    return enqueue("comment", "comment_on_target_posts_steps", quota="comment", target_username=target_account, count=count)
 
-@app.route('/reply_stories', methods=['POST'])
+@bp.route('/reply_stories', methods=['POST'])
 def reply_stories():
-    result = bot.reply_to_followers_stories(3)
-    return jsonify(result)
+    return enqueue("reply_stories", "reply_to_followers_stories_steps", count=3)
 
-@app.route('/unfollow', methods=['POST'])
+@bp.route('/unfollow', methods=['POST'])
 def unfollow():
-    result = bot.check_and_unfollow()
-    return jsonify(result)
+    return enqueue("unfollow", "check_and_unfollow_steps", quota="unfollow")
 
-@app.route('/reply_messages', methods=['POST'])
+@bp.route('/reply_messages', methods=['POST'])
 def reply_messages():
-    result = bot.auto_reply_direct_messages()
-    return jsonify(result)
+    return enqueue("reply_messages", "auto_reply_direct_messages_steps")
 
-@app.route('/start_auto', methods=['POST'])
+@bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({"jobs": bot.list_jobs()})
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = bot.get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "❌ کار پیدا نشد"}), 404
+    return jsonify(job)
+
+@bp.route('/start_auto', methods=['POST'])
 def start_auto():
     if bot.is_logged_in:
         bot.start_scheduled_services()
@@ -784,41 +1386,193 @@ def start_auto():
     else:
         return jsonify({"status": "error", "message": "❌ اول وارد حساب کاربری شوید"})
 
-@app.route('/stop_auto', methods=['POST'])
+@bp.route('/stop_auto', methods=['POST'])
 def stop_auto():
-    if hasattr(bot, 'scheduler') and bot.scheduler.running:
-        bot.scheduler.shutdown()
+    if bot.pause_scheduled_services():
         return jsonify({"status": "success", "message": "✅ سرویس خودکار متوقف شد"})
     else:
         return jsonify({"status": "error", "message": "❌ سرویس خودکار در حال اجرا نیست"})
 
-@app.route('/update_settings', methods=['POST'])
+@bp.route('/update_settings', methods=['POST'])
 def update_settings():
     data = request.get_json()
+    changes = {}
     
     if 'target_accounts' in data:
-        bot.config["target_accounts"] = data['target_accounts']
+        changes["target_accounts"] = data['target_accounts']
     
     if 'comments' in data:
-        bot.config["comments"] = data['comments']
+        changes["comments"] = data['comments']
     
     if 'story_replies' in data:
-        bot.config["story_replies"] = data['story_replies']
+        changes["story_replies"] = data['story_replies']
     
-    if 'daily_follow_limit' in data:
-        bot.config["daily_follow_limit"] = data['daily_follow_limit']
+    for key in ('daily_follow_limit', 'daily_unfollow_limit', 'daily_comment_limit'):
+        if key in data:
+            changes[key] = int(data[key])
     
-    bot.save_config()
+    if 'stats_ttl' in data:
+        try:
+            stats_ttl = float(data['stats_ttl'])
+        except (TypeError, ValueError):
+            stats_ttl = 0
+        if not stats_ttl > 0:
+            return jsonify({"status": "error", "message": "❌ stats_ttl باید عدد مثبت (ثانیه) باشد"}), 400
+        changes["stats_ttl"] = stats_ttl
+    
+    bot.update_config(changes)
     return jsonify({"status": "success", "message": "✅ تنظیمات به‌روز شد"})
 
-@app.route('/get_settings', methods=['GET'])
+@bp.route('/get_settings', methods=['GET'])
 def get_settings():
-    return jsonify(bot.config)
+    return jsonify(bot.get_config())
 
-@app.route('/stats', methods=['GET'])
+@bp.route('/stats', methods=['GET'])
 def stats():
     stats = bot.get_stats()
     return jsonify(stats)
 
+@bp.route('/events', methods=['GET'])
+def events():
+    """جریان SSE رویدادهای کار و تغییرات آمار؛ اولین رویداد آمار کامل است"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        bot.event_stream(last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(bot.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def debug_allowed():
+    """None اگر هدر X-Debug-Token برابر DEBUG_TOKEN است، وگرنه پاسخ خطا
+
+    بدون DEBUG_TOKEN مسیرهای /debug وجود ندارند (404). توکن در query string
+    پذیرفته نمی‌شود چون خط درخواست در لاگ دسترسی نوشته می‌شود.
+    """
+    token = os.getenv("DEBUG_TOKEN")
+    if not token:
+        return jsonify({"status": "error", "message": "❌ پیدا نشد"}), 404
+    given = request.headers.get('X-Debug-Token', '')
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        return jsonify({"status": "error", "message": "❌ دسترسی ندارید"}), 403
+    return None
+
+@bp.route('/debug/profile', methods=['GET', 'POST'])
+def debug_profile():
+    """پروفایل route این پروسه یا کار ربات: {"route": "stats", "enabled": true} یا {"job": "daily_follow"}
+
+    در حالت production هر worker routeهای خودش را پروفایل می‌کند.
+    """
+    denied = debug_allowed()
+    if denied:
+        return denied
+    
+    if request.method == 'POST':
+        data = request.json or {}
+        enabled = bool(data.get('enabled', True))
+        if data.get('route'):
+            endpoint = data['route'] if '.' in data['route'] else f"{bp.name}.{data['route']}"
+            if endpoint not in current_app.view_functions or endpoint.startswith(f"{bp.name}.debug_"):
+                return jsonify({"status": "error", "message": f"❌ route {endpoint} پیدا نشد"}), 400
+            if enabled:
+                profiler.enable_route(current_app, endpoint)
+            else:
+                profiler.disable_route(current_app, endpoint)
+        elif data.get('job'):
+            bot.set_job_profiling(data['job'], enabled)
+        else:
+            return jsonify({"status": "error", "message": "❌ route یا job لازم است"}), 400
+    
+    status = bot.profiling_status()
+    status["routes"] = sorted(profiler.routes)
+    return jsonify(status)
+
+@bp.route('/debug/memory', methods=['GET', 'POST'])
+def debug_memory():
+    """tracemalloc پروسه ربات: POST با action (start، stop، baseline)، GET گزارش و تفاوت با baseline"""
+    denied = debug_allowed()
+    if denied:
+        return denied
+    
+    if request.method == 'POST':
+        data = request.json or {}
+        action = data.get('action')
+        if action not in ('start', 'stop', 'baseline'):
+            return jsonify({"status": "error", "message": "❌ action باید start، stop یا baseline باشد"}), 400
+        return jsonify(bot.memory_control(action, int(data.get('frames', 10))))
+    
+    key_type = request.args.get('key', 'lineno')
+    if key_type not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"status": "error", "message": "❌ key باید lineno، filename یا traceback باشد"}), 400
+    return jsonify(bot.memory_report(request.args.get('limit', 20, type=int), key_type))
+
+@bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok", "bot_ready": _bot is not None})
+
+def create_app(warm_bot=False, bot_instance=None):
+    """ساخت اپ Flask؛ ربات و کلاینت اینستاگرام تا اولین استفاده ساخته نمی‌شوند
+
+    با warm_bot=True ربات در پس‌زمینه ساخته می‌شود تا نشست ذخیره شده و
+    سرویس‌های زمان‌بندی شده بدون منتظر ماندن برای اولین درخواست برگردند.
+    bot_instance یک ربات آماده (مثلا با FakeClient) را جایگزین می‌کند.
+    """
+    global _bot
+    if bot_instance is not None:
+        _bot = bot_instance
+    
+    app = Flask(__name__)
+    app.secret_key = 'instagram-bot-secret-key-2024'
+    app.register_blueprint(bp)
+    metrics.instrument_app(app)
+    # در حالت worker فقط پروسه مالک فایل لاگ را می‌نویسد و می‌چرخاند؛ چرخاندن
+    # یک فایل از چند پروسه رکوردها را گم یا قاطی می‌کند
+    setup_logging(path="" if os.getenv("BOT_SOCKET") else None)
+    # listener نخ daemon است؛ بدون این لاگ‌های مانده در صف هنگام خروج گم می‌شوند
+    atexit.register(stop_logging)
+    
+    if warm_bot:
+        threading.Thread(target=get_bot, name="bot-warmup", daemon=True).start()
+    return app
+
+def run_owner(socket_path):
+    """اجرای پروسه مالک ربات برای حالت production
+
+    ربات، زمان‌بند و دفتر فالوها فقط در این پروسه ساخته می‌شوند و workerهای
+    HTTP (با همان BOT_SOCKET) از طریق سوکت Unix با آن کار می‌کنند:
+
+        BOT_SOCKET=/run/instagram-bot.sock python app.py --owner
+        BOT_SOCKET=/run/instagram-bot.sock gunicorn -w 4 -k gthread --threads 16 --timeout 0 'app:create_app()'
+
+    هر داشبورد باز یک نخ worker را برای /events نگه می‌دارد، پس --threads
+    باید از تعداد داشبوردهای هم‌زمان به اضافه چند نخ برای درخواست‌های عادی
+    بیشتر باشد (پیش‌فرض gunicorn یک نخ است). --timeout 0 جلوی کشته شدن
+    worker با جریان‌های طولانی را می‌گیرد.
+    """
+    global _bot
+    setup_logging()
+    atexit.register(stop_logging)
+    _bot = build_bot()
+    server = BotServer(_bot, socket_path, ipc_authkey())
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    import argparse
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--owner", action="store_true", help="اجرای پروسه مالک ربات روی BOT_SOCKET")
+    args = parser.parse_args()
+    
+    if args.owner:
+        run_owner(os.getenv("BOT_SOCKET", "instagram-bot.sock"))
+    else:
+        # reloader حالت debug این فایل را در دو پروسه اجرا می‌کند؛ ربات (و
+        # زمان‌بند آن) فقط در پروسه‌ای که درخواست‌ها را سرو می‌کند ساخته می‌شود
+        app = create_app(warm_bot=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
+        app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,80 @@
+"""مقایسه زمان پیدا کردن کاربران سررسید شده برای آنفالو
+
+روش قبلی: پیمایش کل followed_users و fromisoformat روی هر رکورد.
+روش جدید: FollowLedger.pop_due روی min-heap زمان‌های فالو.
+
+    python benchmarks/due_index.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import FollowLedger
+from storage import Database
+
+UNFOLLOW_AFTER_DAYS = 2
+DUE_RATIO = 0.01
+
+
+def build_ledger(size):
+    db = Database(':memory:')
+    # فقط برای ساختن جدول؛ دفتر بعد از درج رکوردها دوباره بارگذاری می‌شود
+    FollowLedger(db)
+    now = datetime.now()
+    rows = []
+    for i in range(size):
+        # حدود ۱٪ رکوردها قدیمی‌تر از مهلت آنفالو هستند
+        if random.random() < DUE_RATIO:
+            follow_date = now - timedelta(days=UNFOLLOW_AFTER_DAYS, hours=random.uniform(1, 48))
+        else:
+            follow_date = now - timedelta(hours=random.uniform(0, UNFOLLOW_AFTER_DAYS * 24 - 1))
+        rows.append((str(i), f"user{i}", follow_date.isoformat(), "natgeo", 0))
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO followed_users VALUES (?, ?, ?, ?, ?)", rows)
+    return FollowLedger(db)
+
+
+def scan_before(followed_users):
+    current_time = datetime.now()
+    due = []
+    for user_id, user_data in list(followed_users.items()):
+        follow_date = datetime.fromisoformat(user_data["follow_date"])
+        if (current_time - follow_date).days >= UNFOLLOW_AFTER_DAYS:
+            due.append(user_id)
+    return due
+
+
+def scan_after(ledger):
+    cutoff = time.time() - UNFOLLOW_AFTER_DAYS * 86400
+    due = ledger.pop_due(cutoff)
+    for user_id in due:
+        ledger.requeue(user_id)
+    return due
+
+
+def measure(func, arg, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(result)
+
+
+def main():
+    print(f"{'entries':>8} {'due':>6} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for size in (10_000, 100_000):
+        ledger = build_ledger(size)
+        before, due_before = measure(scan_before, dict(ledger.items()))
+        after, due_after = measure(scan_after, ledger)
+        assert due_before == due_after
+        print(f"{size:>8} {due_after:>6} {before * 1000:>12.2f} {after * 1000:>11.2f} {before / after:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""حافظه دفتر فالوها در اندازه‌های مختلف (tracemalloc)
+
+روش قبلی: یک دیکشنری چهار کلیدی برای هر رکورد با تاریخ ISO، دیکشنری جدا
+برای زمان‌های float و heap. روش جدید: FollowRecord با __slots__، epoch صحیح،
+منبع intern شده و followed_back به صورت بیت.
+
+    python benchmarks/ledger_memory.py --sizes 10000 100000 1000000
+"""
+import argparse
+import gc
+import heapq
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import MappingProxyType
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import FollowLedger
+from storage import Database
+
+SOURCES = ("natgeo", "nasa", "instagram", "nike", "bbcpersian")
+
+
+def build_db(size):
+    db = Database(':memory:')
+    FollowLedger(db)
+    now = datetime.now()
+    rows = (
+        (str(1_000_000_000 + i), f"user{i}", (now - timedelta(seconds=i * 7)).isoformat(),
+         SOURCES[i % len(SOURCES)], i % 3 == 0)
+        for i in range(size)
+    )
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO followed_users VALUES (?, ?, ?, ?, ?)", rows)
+    return db
+
+
+def load_before(db):
+    """همان ساختار حافظه نسخه قبل از رکوردهای فشرده"""
+    entries, timestamps = {}, {}
+    for pk, username, follow_date, source_account, followed_back in db.query(
+        "SELECT pk, username, follow_date, source_account, followed_back FROM followed_users"
+    ):
+        entries[pk] = MappingProxyType({
+            "username": username,
+            "follow_date": follow_date,
+            "source_account": source_account,
+            "followed_back": bool(followed_back)
+        })
+        timestamps[pk] = datetime.fromisoformat(follow_date).timestamp()
+    due_heap = [(ts, pk) for pk, ts in timestamps.items()]
+    heapq.heapify(due_heap)
+    return entries, timestamps, due_heap
+
+
+def measure(load, db):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load(db)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'records':>10} {'before MB':>10} {'after MB':>10} {'B/rec before':>13} {'B/rec after':>12} "
+          f"{'ratio':>6} {'load s before':>14} {'load s after':>13}")
+    for size in args.sizes:
+        db = build_db(size)
+        before, _, before_seconds = measure(load_before, db)
+        after, _, after_seconds = measure(FollowLedger, db)
+
+        # خروجی JSON باید همان شکل قبلی را داشته باشد
+        sample = next(iter(FollowLedger(db).to_dict().values()))
+        assert set(sample) == {"username", "follow_date", "source_account", "followed_back"}
+        db.close()
+
+        print(f"{size:>10} {before / 2**20:>10.1f} {after / 2**20:>10.1f} {before / size:>13.0f} "
+              f"{after / size:>12.0f} {after / before:>6.2f} {before_seconds:>14.2f} {after_seconds:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
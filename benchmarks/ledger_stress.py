@@ -0,0 +1,228 @@
+"""آزمون فشار هم‌زمانی دفتر فالوها
+
+چند نخ نویسنده (درج، تغییر followed_back، حذف سررسیدها) و چند نخ خواننده
+(snapshot، اندازه و جستجوی تکی مثل /stats و آنفالو، و گاهی پیمایش کامل،
+شمارش followed_back و to_dict) هم‌زمان روی یک دفتر کار می‌کنند. در
+پایان نسخه حافظه با SQLite و با مجموعه مورد انتظار هر نویسنده مقایسه می‌شود
+و توان عملیاتی نویسنده‌ها با و بدون خواننده گزارش می‌شود. بعد همین کار روی
+ربات کامل با FakeClient انجام می‌شود: کارهای فالو و آنفالو هم‌زمان با
+درخواست‌های /stats.
+
+    python benchmarks/ledger_stress.py --writers 4 --readers 4 --ops 2000
+    python benchmarks/ledger_stress.py --prefill 200000
+    python benchmarks/ledger_stress.py --scan-every 1
+
+هر خواننده هر scan-every خواندن یک بار کل دفتر را پیمایش می‌کند (پیش‌فرض
+حدود یک بار در ثانیه). پیمایش کامل O(n) کار پایتونی خود خواننده زیر GIL است
+و هیچ قفلی از نویسنده نمی‌گیرد؛ با --scan-every 1 چهار خواننده تقریبا همه CPU
+را می‌گیرند و توان نویسنده‌ها به همان نسبت پایین می‌آید.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ledger import FollowLedger
+from storage import Database
+
+
+def writer(ledger, worker, ops, expected, errors):
+    rng = random.Random(worker)
+    owned = expected[worker]
+    now = datetime.now()
+    try:
+        for i in range(ops):
+            choice = rng.random()
+            if choice < 0.6 or not owned:
+                pk = f"{worker}-{i}"
+                ledger[pk] = {
+                    "username": f"user{pk}",
+                    # نیمی از رکوردها برای pop_due سررسید شده‌اند
+                    "follow_date": (now - timedelta(days=rng.choice((0, 3)))).isoformat(),
+                    "source_account": "natgeo",
+                    "followed_back": False
+                }
+                owned.add(pk)
+            elif choice < 0.8:
+                ledger.set_fields(rng.choice(tuple(owned)), followed_back=True)
+            else:
+                pk = owned.pop()
+                del ledger[pk]
+    except Exception as e:
+        errors.append(("writer", repr(e)))
+
+
+def reader(ledger, stop, interval, scan_every, counter, errors):
+    reads = 0
+    try:
+        while not stop.is_set():
+            snapshot = ledger.snapshot()
+            # پیمایش کامل هزینه خود خواننده است (O(n) زیر GIL)، نه هزینه snapshot
+            if (reads + 1) % scan_every == 0:
+                followed_back = sum(1 for record in snapshot.values() if record["followed_back"])
+                if followed_back > len(snapshot):
+                    errors.append(("reader", "impossible count"))
+            for pk in ledger:
+                ledger.get(pk)
+                break
+            if (reads + 1) % (50 * scan_every) == 0:
+                ledger.to_dict()
+            reads += 1
+            # خواننده‌ها مثل درخواست‌های HTTP فاصله دارند؛ حلقه داغ فقط GIL را اشغال می‌کند
+            time.sleep(interval)
+    except Exception as e:
+        errors.append(("reader", repr(e)))
+    counter.append(reads)
+
+
+def prefill(db, count):
+    """رکوردهای قدیمی که فقط اندازه دفتر را بزرگ می‌کنند"""
+    FollowLedger(db)
+    follow_date = (datetime.now() - timedelta(days=30)).isoformat()
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO followed_users VALUES (?, ?, ?, ?, 1)",
+            ((f"old-{i}", f"old{i}", follow_date, "natgeo") for i in range(count))
+        )
+
+
+def run_ledger(workdir, writers, readers, ops, interval=0.001, size=0, scan_every=1):
+    db = Database(os.path.join(workdir, f'stress-{readers}-{size}.db'))
+    prefill(db, size)
+    ledger = FollowLedger(db)
+    expected = {worker: set() for worker in range(writers)}
+    errors, reads, stop = [], [], threading.Event()
+
+    reader_threads = [
+        threading.Thread(target=reader, args=(ledger, stop, interval, scan_every, reads, errors)) for _ in range(readers)
+    ]
+    writer_threads = [threading.Thread(target=writer, args=(ledger, w, ops, expected, errors)) for w in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+
+    # pop_due و requeue هم‌زمان با هم نباید رکوردی را گم کنند
+    due = ledger.pop_due(time.time() - 2 * 86400)
+    for pk in due:
+        ledger.requeue(pk)
+    due_again = ledger.pop_due(time.time() - 2 * 86400)
+
+    wanted = set().union(*expected.values()) | {f"old-{i}" for i in range(size)}
+    stored = {row[0]: bool(row[1]) for row in db.query("SELECT pk, followed_back FROM followed_users")}
+    memory = {pk: record["followed_back"] for pk, record in ledger.items()}
+    checks = {
+        "memory_matches_expected": set(memory) == wanted,
+        "memory_matches_sqlite": memory == stored,
+        "reopen_matches": FollowLedger(db).to_dict() == ledger.to_dict(),
+        "due_index_stable": sorted(due) == sorted(due_again),
+    }
+    return {
+        "writes_per_second": writers * ops / elapsed,
+        "reads": sum(reads),
+        "entries": len(ledger),
+        "errors": errors[:5],
+        "checks": checks,
+    }
+
+
+def run_bot(workdir, jobs, readers):
+    import app as app_module
+    from fake_client import FakeClient
+
+    os.chdir(workdir)
+    bot = app_module.AdvancedInstagramBot(db_path=os.path.join(workdir, 'bot.db'), client=FakeClient(seed=1))
+    bot.login('stress', 'stress')
+    bot.config_store.update(daily_follow_limit=10_000, daily_unfollow_limit=10_000, unfollow_after_days=0)
+    app = app_module.create_app(bot_instance=bot)
+
+    errors, stop, latencies = [], threading.Event(), []
+
+    def poll():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get('/stats')
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    pollers = [threading.Thread(target=poll) for _ in range(readers)]
+    for thread in pollers:
+        thread.start()
+    client = app.test_client()
+    submitted = []
+    for i in range(jobs):
+        # دسته‌های هم‌زمان یک هدف رد می‌شوند، پس هر کار فالو هدف خودش را دارد
+        path, body = ('/follow', {"target_account": f"target{i}", "count": 20}) if i % 3 else ('/unfollow', None)
+        submitted.append(client.post(path, json=body).get_json()["job_id"])
+    while any(not bot.jobs.get(job_id).finished for job_id in submitted):
+        time.sleep(0.05)
+    stop.set()
+    for thread in pollers:
+        thread.join()
+
+    failed = [bot.jobs.get(job_id).to_dict() for job_id in submitted
+              if bot.jobs.get(job_id).state != "finished" or bot.jobs.get(job_id).result["status"] != "success"]
+    stored = {row[0] for row in bot.db.query("SELECT pk FROM followed_users")}
+    bot.scheduler.shutdown(wait=False)
+    os.chdir(ROOT)
+    latencies.sort()
+    return {
+        "jobs": len(submitted),
+        "failed_jobs": failed[:3],
+        "stats_requests": len(latencies),
+        "stats_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        "http_errors": errors[:5],
+        "checks": {"memory_matches_sqlite": set(bot.followed_users) == stored},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=2000, help="تعداد عملیات هر نویسنده")
+    parser.add_argument("--read-interval", type=float, default=0.001, help="فاصله بین خواندن‌های هر خواننده (ثانیه)")
+    parser.add_argument("--prefill", type=int, default=0, help="تعداد رکوردهای موجود در دفتر قبل از شروع")
+    parser.add_argument("--scan-every", type=int, default=1000, help="هر چند خواندن یک بار کل دفتر پیمایش شود")
+    parser.add_argument("--jobs", type=int, default=12, help="تعداد کارهای فالو/آنفالو ربات")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = run_ledger(workdir, args.writers, 0, args.ops, size=args.prefill)
+        loaded = run_ledger(workdir, args.writers, args.readers, args.ops, args.read_interval,
+                            args.prefill, args.scan_every)
+        # بدون تأخیر تصادفی بین عملیات ربات؛ random بعد از این بلوک دست نخورده است
+        with mock.patch("random.uniform", lambda a, b: 0):
+            bot = run_bot(workdir, args.jobs, args.readers)
+
+    for name, result in (("ledger, no readers", baseline), (f"ledger, {args.readers} readers", loaded), ("bot", bot)):
+        print(f"\n{name}:")
+        for key, value in result.items():
+            print(f"  {key:<24} {value}")
+        ok = ok and all(result["checks"].values()) and not result.get("errors") \
+            and not result.get("failed_jobs") and not result.get("http_errors")
+    print(f"\nتوان نوشتن با خواننده‌ها: {loaded['writes_per_second'] / baseline['writes_per_second']:.2f}x بدون خواننده")
+    print("✅ سازگار" if ok else "❌ ناسازگاری پیدا شد")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""مقایسه پیدا کردن پاسخ پیام مستقیم با جدول‌های چند هزار کلمه کلیدی
+
+روش قبلی: lower() و بررسی زیررشته برای هر کلمه کلیدی.
+روش جدید: KeywordMatcher (Aho-Corasick روی متن یکسان‌سازی شده).
+
+    python benchmarks/matcher.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import KeywordMatcher
+
+LETTERS = "ابپتثجچحخدذرزسشصضطظعغفقکگلمنوهی"
+MESSAGES = 2_000
+
+
+def random_word(low=3, high=8):
+    return "".join(random.choice(LETTERS) for _ in range(random.randint(low, high)))
+
+
+def random_message():
+    return " ".join(random_word() for _ in range(random.randint(5, 30)))
+
+
+def naive(responses, text):
+    message_text = text.lower()
+    for keyword, reply in responses.items():
+        if keyword in message_text:
+            return reply
+    return None
+
+
+def main():
+    random.seed(1)
+    messages = [random_message() for _ in range(MESSAGES)]
+    print(f"{'keywords':>8} {'build (ms)':>11} {'before (µs/msg)':>16} {'after (µs/msg)':>15} {'speedup':>8}")
+    for size in (100, 1_000, 5_000):
+        responses = {random_word(6, 10): f"reply {i}" for i in range(size)}
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(responses)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [naive(responses, text) for text in messages]
+        before = (time.perf_counter() - start) / MESSAGES
+
+        start = time.perf_counter()
+        found = [matcher.match(text) for text in messages]
+        after = (time.perf_counter() - start) / MESSAGES
+
+        assert found == expected
+        print(f"{size:>8} {build * 1000:>11.1f} {before * 1e6:>16.1f} {after * 1e6:>15.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""مجموعه بنچمارک سرتاسری ربات با FakeClient به جای حساب واقعی اینستاگرام
+
+متدهای کار (با ساعت مجازی تا تأخیرهای بین عملیات واقعا صبر نشوند)،
+endpointهای Flask (با بار هم‌زمان روی /stats) و عملیات دفتر فالوها اندازه
+گرفته می‌شوند و نتیجه به صورت JSON نوشته می‌شود تا بین نسخه‌ها مقایسه شود.
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --output new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as app_module
+from fake_client import FakeClient
+from ledger import FollowLedger
+from pacer import VirtualClock
+from storage import Database
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def make_bot(workdir, latency):
+    client = FakeClient(latency=latency, seed=1)
+    bot = app_module.AdvancedInstagramBot(
+        clock=VirtualClock(), db_path=os.path.join(workdir, 'bot.db'), client=client
+    )
+    bot.login('bench', 'bench')
+    return bot, client
+
+
+def run_task(bot, client, func, *args):
+    calls_before = dict(client.calls)
+    virtual_before = bot.pacer.clock.now()
+    start = time.perf_counter()
+    result = func(*args)
+    wall = time.perf_counter() - start
+    calls = {name: count - calls_before.get(name, 0) for name, count in client.calls.items()
+             if count - calls_before.get(name, 0)}
+    return {
+        "wall_seconds": wall,
+        "paced_seconds": bot.pacer.clock.now() - virtual_before,
+        "client_calls": calls,
+        "client_calls_total": sum(calls.values()),
+        "status": result.get("status")
+    }
+
+
+def bench_tasks(bot, client):
+    results = {
+        "follow_50": run_task(bot, client, bot.follow_users_from_target, "natgeo", 50),
+        "comment_10": run_task(bot, client, bot.comment_on_target_posts, "nike", 10),
+        "reply_stories_20": run_task(bot, client, bot.reply_to_followers_stories, 20),
+        "reply_messages": run_task(bot, client, bot.auto_reply_direct_messages),
+    }
+    # جلو بردن ساعت مجازی تا فالوها برای آنفالو سررسید شوند
+    bot.pacer.clock.advance_to(bot.pacer.clock.now() + 3 * 86400)
+    results["unfollow_due"] = run_task(bot, client, bot.check_and_unfollow)
+    return results
+
+
+def bench_endpoints(bot, threads, requests_per_thread):
+    app = app_module.create_app(bot_instance=bot)
+    results = {}
+
+    def timed(client, method, path, **kwargs):
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - start
+        assert response.status_code < 500, response.status_code
+        return elapsed
+
+    client = app.test_client()
+    for name, method, path, kwargs in (
+        ("home", "get", "/", {}),
+        ("get_settings", "get", "/get_settings", {}),
+        ("enqueue_reply_messages", "post", "/reply_messages", {}),
+        ("enqueue_follow", "post", "/follow", {"json": {"target_account": "random", "count": 5}}),
+    ):
+        samples = [timed(client, method, path, **kwargs) for _ in range(50)]
+        results[name] = {
+            "requests": len(samples),
+            "p50_ms": percentile(samples, 0.5) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000
+        }
+
+    # بار هم‌زمان روی /stats
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local_client = app.test_client()
+        samples = [timed(local_client, "get", "/stats") for _ in range(requests_per_thread)]
+        with lock:
+            latencies.extend(samples)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    results["stats_concurrent"] = {
+        "threads": threads,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+    return results
+
+
+def bench_ledger(workdir, size):
+    results = {}
+    ledger = FollowLedger(Database(os.path.join(workdir, 'ledger.db')))
+    now = datetime.now()
+    records = {
+        str(i): {
+            "username": f"user{i}",
+            "follow_date": (now - timedelta(hours=i % 96)).isoformat(),
+            "source_account": "natgeo",
+            "followed_back": False
+        }
+        for i in range(size)
+    }
+
+    start = time.perf_counter()
+    for pk, record in records.items():
+        ledger[pk] = record
+    elapsed = time.perf_counter() - start
+    results["upsert"] = {"records": size, "seconds": elapsed, "ops_per_second": size / elapsed}
+
+    start = time.perf_counter()
+    reopened = FollowLedger(ledger.db)
+    results["load"] = {"records": len(reopened), "seconds": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    due = reopened.pop_due(time.time() - 2 * 86400)
+    results["pop_due"] = {"records": size, "due": len(due), "seconds": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    for pk in due:
+        del reopened[pk]
+    elapsed = time.perf_counter() - start
+    results["delete"] = {"records": len(due), "seconds": elapsed}
+
+    json_path = os.path.join(workdir, 'followed_users.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    start = time.perf_counter()
+    migrated = FollowLedger(Database(os.path.join(workdir, 'migrate.db'))).migrate_json(json_path)
+    results["migrate_json"] = {"records": migrated, "seconds": time.perf_counter() - start}
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform()
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(old, new):
+    old_values = dict(flatten(old["results"]))
+    print(f"\nمقایسه با {old['meta'].get('commit')}:")
+    for name, value in flatten(new["results"]):
+        if name in old_values and old_values[name]:
+            ratio = value / old_values[name]
+            marker = "  " if 0.9 <= ratio <= 1.1 else "⚠️" if ratio > 1.1 else "✅"
+            print(f"{marker} {name:<55} {old_values[name]:>12.4f} -> {value:>12.4f} ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--latency", type=float, default=0.002, help="تأخیر هر درخواست FakeClient (ثانیه)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="تعداد درخواست /stats برای هر نخ")
+    parser.add_argument("--ledger-size", type=int, default=10_000)
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        bot, client = make_bot(workdir, args.latency)
+        report = {
+            "meta": dict(metadata(), latency=args.latency),
+            "results": {
+                "tasks": bench_tasks(bot, client),
+                "endpoints": bench_endpoints(bot, args.threads, args.requests),
+                "ledger": bench_ledger(workdir, args.ledger_size)
+            }
+        }
+        bot.scheduler.shutdown(wait=False)
+        os.chdir(ROOT)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    for name, value in flatten(report["results"]):
+        print(f"{name:<58} {value:>12.4f}")
+    print(f"\n✅ نتیجه در {output} ذخیره شد")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""زمان راه‌اندازی سرد: import ماژول app و اولین پاسخ صفحه اصلی
+
+هر اندازه‌گیری در یک پروسه تازه و یک پوشه خالی اجرا می‌شود تا کش import و
+فایل‌های config.json/bot.db قبلی روی نتیجه اثر نگذارند.
+
+    python benchmarks/startup.py --budget 1.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import app
+imported = time.perf_counter()
+client = app.create_app().test_client()
+response = client.get('/')
+assert response.status_code == 200
+first_response = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "first_response": first_response - start,
+    "instagrapi_loaded": "instagrapi" in sys.modules
+}}))
+"""
+
+
+def probe():
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(root=ROOT)],
+            cwd=workdir, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="حداکثر مجاز زمان تا اولین پاسخ (ثانیه)")
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(args.runs)]
+    import_time = statistics.median(r["import"] for r in results)
+    first_response = statistics.median(r["first_response"] for r in results)
+    print(f"import app:        {import_time * 1000:8.1f} ms (median of {args.runs})")
+    print(f"first response /:  {first_response * 1000:8.1f} ms")
+    print(f"instagrapi loaded: {any(r['instagrapi_loaded'] for r in results)}")
+
+    if args.budget is not None and first_response > args.budget:
+        print(f"❌ بیشتر از بودجه {args.budget:.2f} ثانیه")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""اجرای چند روز کامل کارهای زمان‌بندی شده با ساعت مجازی pacer
+
+به جای APScheduler که با ساعت واقعی کار می‌کند، هر ورودی SCHEDULED_JOBS با
+Pacer.every (کارهای interval) یا Pacer.call_later تا ساعت cron و بعد every
+روزانه روی pacer ثبت می‌شود و pacer.advance() روزها را در چند ثانیه جلو
+می‌برد. همان مسیر run_scheduled_task (ساعات کاری، رد نوبت تکراری، سهمیه‌ها و
+JobManager) اجرا می‌شود و تعداد اجراها و فراخوانی‌های کلاینت گزارش می‌شود.
+
+    python benchmarks/virtual_day.py --days 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as app_module
+from fake_client import FakeClient
+from pacer import VirtualClock
+
+DAY = 86400
+
+
+def schedule(bot, runs):
+    """ثبت SCHEDULED_JOBS روی pacer؛ ساعت مجازی از نیمه‌شب شروع می‌شود"""
+    pacer = bot.pacer
+
+    def run(job_id):
+        runs[job_id] += 1
+        bot.run_scheduled_task(job_id)
+
+    for job_id, (_, kind, fields) in app_module.SCHEDULED_JOBS.items():
+        if kind == "interval":
+            interval = fields.get("hours", 0) * 3600 + fields.get("minutes", 0) * 60 + fields.get("seconds", 0)
+            pacer.every(interval, lambda job_id=job_id: run(job_id))
+            continue
+
+        def start(job_id=job_id):
+            pacer.every(DAY, lambda: run(job_id))
+            run(job_id)
+
+        pacer.call_later(fields.get("hour", 0) * 3600 + fields.get("minute", 0) * 60, start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.0, help="تأخیر هر فراخوانی FakeClient (ثانیه واقعی)")
+    parser.add_argument('--output', help="نوشتن نتیجه در فایل JSON")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        client = FakeClient(latency=args.latency, seed=1)
+        bot = app_module.AdvancedInstagramBot(
+            clock=VirtualClock(start=midnight), db_path=os.path.join(workdir, 'bot.db'), client=client
+        )
+        bot.login('bench', 'bench')
+        # کارها فقط از pacer اجرا می‌شوند، نه از APScheduler با ساعت واقعی
+        bot.scheduler.shutdown(wait=False)
+
+        runs = Counter()
+        schedule(bot, runs)
+        start = time.perf_counter()
+        bot.pacer.advance(args.days * DAY)
+        wall = time.perf_counter() - start
+
+        jobs = Counter()
+        for job in bot.jobs.list():
+            jobs[f"{job['name']}:{job['state']}"] += 1
+        result = {
+            "days": args.days,
+            "wall_seconds": wall,
+            "virtual_seconds": bot.pacer.clock.now(),
+            "scheduled_runs": dict(runs),
+            "jobs": dict(jobs),
+            "client_calls": dict(client.calls),
+            "client_calls_total": sum(client.calls.values()),
+            "pending_steps": bot.pacer.pending(),
+        }
+        bot.jobs.executor.shutdown(wait=True)
+        os.chdir(ROOT)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
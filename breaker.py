@@ -0,0 +1,204 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# دسته‌بندی خطاها با نام کلاس تا instagrapi فقط برای این کار وارد نشود
+AUTH_ERRORS = {"LoginRequired", "ChallengeRequired", "ChallengeError"}
+THROTTLE_ERRORS = {"PleaseWaitFewMinutes", "ClientThrottledError", "RateLimitError", "FeedbackRequired"}
+TRANSIENT_ERRORS = {"ClientConnectionError", "ClientRequestTimeout", "ConnectionError", "TimeoutError"}
+
+# متدهایی که برای ورود و مدیریت نشست لازم‌اند و هرگز مسدود نمی‌شوند
+EXEMPT_METHODS = {"login", "get_settings", "set_settings", "set_uuids", "set_proxy"}
+
+
+def classify(error):
+    """auth، throttle، transient یا None برای خطاهای معمولی (مثلا کاربر پیدا نشد)"""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & AUTH_ERRORS:
+        return "auth"
+    if names & THROTTLE_ERRORS:
+        return "throttle"
+    if names & TRANSIENT_ERRORS:
+        return "transient"
+    return None
+
+
+def is_fatal(error):
+    """خطایی که ادامه دسته را بی‌فایده می‌کند (مدار باز، احراز هویت، محدودیت نرخ)"""
+    return isinstance(error, CircuitOpenError) or classify(error) in ("auth", "throttle")
+
+
+class CircuitOpenError(Exception):
+    """درخواست به اینستاگرام فرستاده نشد چون مدار باز است"""
+
+    def __init__(self, reason, retry_at=None):
+        self.reason = reason
+        self.retry_at = retry_at
+        super().__init__(f"upstream paused ({reason})")
+
+
+class CircuitBreaker:
+    """مدار مشترک همه فراخوانی‌های کلاینت
+
+    خطای احراز هویت مدار را تا ورود دوباره باز می‌کند و on_trip صدا زده
+    می‌شود. محدودیت نرخ مدار را برای cooldown باز می‌کند که با هر تکرار دو
+    برابر می‌شود (تا max_cooldown). خطای گذرا با backoff نمایی و jitter دوباره
+    امتحان می‌شود و بعد از failure_threshold شکست پشت سر هم مدار را کوتاه باز
+    می‌کند. بعد از cooldown فقط یک درخواست آزمایشی (half-open) رد می‌شود.
+
+    گام‌های pacer باید paced را با yield from صدا بزنند تا تأخیر backoff به
+    pacer سپرده شود؛ call با sleep منتظر می‌ماند و وقتی can_sleep نادرست است
+    (مثلا روی نخ pacer) اصلا دوباره امتحان نمی‌کند.
+    """
+
+    def __init__(self, cooldown=900, max_cooldown=7200, transient_cooldown=60, failure_threshold=5,
+                 retries=2, backoff_base=1.0, backoff_cap=10.0, clock=time.time, sleep=time.sleep,
+                 can_sleep=lambda: True, on_trip=None):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.transient_cooldown = transient_cooldown
+        self.failure_threshold = failure_threshold
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.clock = clock
+        self.sleep = sleep
+        self.can_sleep = can_sleep
+        self.on_trip = on_trip
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.state = "closed"
+            self.reason = None
+            self.retry_at = None
+            self.failures = 0
+            self.next_cooldown = self.cooldown
+
+    def before_call(self):
+        with self.lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and self.retry_at is not None and self.clock() >= self.retry_at:
+                # یک درخواست آزمایشی؛ بقیه تا نتیجه آن منتظر نمی‌مانند و رد می‌شوند
+                self.state = "half_open"
+                return
+            raise CircuitOpenError(self.reason, self.retry_at)
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                log.info(f"✅ ارتباط با اینستاگرام برقرار شد (مدار {self.reason} بسته شد)")
+            self.state = "closed"
+            self.reason = None
+            self.retry_at = None
+            self.failures = 0
+            self.next_cooldown = self.cooldown
+
+    def trip(self, reason, cooldown=None):
+        with self.lock:
+            self.state = "open"
+            self.reason = reason
+            self.retry_at = None if cooldown is None else self.clock() + cooldown
+        log.warning(f"⛔ مدار باز شد: {reason}" + (f" برای {cooldown:.0f} ثانیه" if cooldown else ""))
+        if self.on_trip:
+            self.on_trip(reason)
+
+    def record_failure(self, kind):
+        if kind == "auth":
+            self.trip("auth")
+        elif kind == "throttle":
+            with self.lock:
+                cooldown = self.next_cooldown
+                self.next_cooldown = min(self.max_cooldown, cooldown * 2)
+            self.trip("throttle", cooldown)
+        elif kind == "transient":
+            with self.lock:
+                self.failures += 1
+                tripped = self.failures >= self.failure_threshold or self.state == "half_open"
+            if tripped:
+                self.trip("transient", self.transient_cooldown)
+        else:
+            # خطای معمولی یعنی اینستاگرام جواب داده است
+            self.record_success()
+
+    def _attempts(self, retries, func, args, kwargs):
+        for attempt in range(retries + 1):
+            self.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if kind == "transient" and attempt < retries:
+                    # full jitter: تأخیر تصادفی بین صفر و سقف نمایی
+                    yield random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                    continue
+                self.record_failure(kind)
+                raise
+            self.record_success()
+            return result
+
+    def paced(self, func, *args, **kwargs):
+        """ژنراتوری که تأخیرهای backoff را yield می‌کند و در پایان نتیجه را برمی‌گرداند"""
+        return self._attempts(self.retries, func, args, kwargs)
+
+    def call(self, func, *args, **kwargs):
+        attempts = self._attempts(self.retries if self.can_sleep() else 0, func, args, kwargs)
+        while True:
+            try:
+                delay = next(attempts)
+            except StopIteration as stop:
+                return stop.value
+            self.sleep(delay)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "reason": self.reason,
+                "retry_at": datetime.fromtimestamp(self.retry_at).isoformat() if self.retry_at else None,
+                "consecutive_failures": self.failures
+            }
+
+
+class GuardedClient:
+    """پوشش Client که همه فراخوانی‌ها (جز ورود و نشست) را از مدار رد می‌کند
+
+    client.paced.method(...) همان فراخوانی را به صورت ژنراتور برای گام‌های
+    pacer برمی‌گرداند: result = yield from self.client.paced.user_follow(pk)
+    """
+
+    def __init__(self, client, breaker):
+        self._client = client
+        self._breaker = breaker
+
+    @property
+    def paced(self):
+        return _PacedClient(self._client, self._breaker)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_") or name in EXEMPT_METHODS:
+            return attribute
+        return lambda *args, **kwargs: self._breaker.call(attribute, *args, **kwargs)
+
+    def __setattr__(self, name, value):
+        if name in ("_client", "_breaker"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._client, name, value)
+
+
+class _PacedClient:
+    def __init__(self, client, breaker):
+        self._client = client
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        return lambda *args, **kwargs: self._breaker.paced(attribute, *args, **kwargs)
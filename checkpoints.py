@@ -0,0 +1,136 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_checkpoints (
+    batch TEXT PRIMARY KEY,
+    plan TEXT NOT NULL,
+    cursor INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class Checkpoint:
+    """برنامه یک دسته (فهرست کاربران) و جای پیشرفت در آن"""
+
+    def __init__(self, store, batch, plan=None, cursor=0):
+        self.store = store
+        self.batch = batch
+        self.plan = plan
+        self.cursor = cursor
+        self.unsynced = 0
+
+    @property
+    def resumed(self):
+        return self.plan is not None
+
+    @property
+    def remaining(self):
+        return self.plan[self.cursor:] if self.plan is not None else []
+
+    def start(self, plan):
+        now = self.store.clock()
+        self.store.db.execute(
+            "INSERT INTO batch_checkpoints VALUES (?, ?, ?, ?, ?) ON CONFLICT(batch) DO UPDATE SET "
+            "plan = excluded.plan, cursor = 0, created_at = excluded.created_at, updated_at = excluded.updated_at",
+            (self.batch, json.dumps(plan, ensure_ascii=False), 0, now, now)
+        )
+        self.plan = list(plan)
+        self.cursor = 0
+
+    @contextmanager
+    def step(self):
+        """نوشتن نتیجه یک مورد و جلو بردن cursor در یک تراکنش
+
+        تغییرات دفتر داخل بلوک با به‌روزرسانی cursor با هم ثبت می‌شوند؛ بعد از
+        هر sync_every مورد فایل WAL یک بار fsync می‌شود. داخل بلوک نباید yield
+        شود چون قفل نویسنده و قفل پایگاه داده (به همین ترتیب) گرفته شده‌اند.
+        """
+        with self.store.write_lock, self.store.db.transaction() as conn:
+            yield
+            conn.execute(
+                "UPDATE batch_checkpoints SET cursor = ?, updated_at = ? WHERE batch = ?",
+                (self.cursor + 1, self.store.clock(), self.batch)
+            )
+        self.cursor += 1
+        self.unsynced += 1
+        if self.unsynced >= self.store.sync_every:
+            self.sync()
+
+    def advance(self):
+        """رد شدن از موردی که چیزی برای نوشتن ندارد (خطا یا نیازی به عمل نبود)"""
+        with self.step():
+            pass
+
+    def sync(self):
+        self.store.db.sync()
+        self.unsynced = 0
+
+    def close(self):
+        """حذف دسته تمام شده؛ دسته نیمه‌کاره برای اجرای بعدی می‌ماند"""
+        try:
+            if self.plan is not None and self.cursor >= len(self.plan):
+                self.store.db.execute("DELETE FROM batch_checkpoints WHERE batch = ?", (self.batch,))
+            elif self.plan is not None:
+                log.info(f"⏸️ دسته {self.batch} در {self.cursor}/{len(self.plan)} متوقف شد و بعدا ادامه می‌یابد")
+            if self.unsynced:
+                self.sync()
+        finally:
+            self.store.release(self.batch)
+
+
+class BatchCheckpoints:
+    """برنامه و پیشرفت دسته‌های فالو و آنفالو که بین ری‌استارت‌ها در SQLite می‌ماند
+
+    اجرای بعدی همان دسته به جای گرفتن دوباره فهرست از اینستاگرام از cursor
+    ادامه می‌دهد. برنامه‌های قدیمی‌تر از max_age کنار گذاشته می‌شوند چون
+    فهرست کاربران دیگر معتبر نیست. write_lock قفل نویسنده داده‌ای است که
+    داخل step تغییر می‌کند و قبل از قفل پایگاه داده گرفته می‌شود.
+    """
+
+    def __init__(self, db, max_age=86400, sync_every=10, clock=time.time, write_lock=None):
+        self.db = db
+        self.write_lock = write_lock or nullcontext()
+        self.max_age = max_age
+        self.sync_every = sync_every
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.active = set()
+        self.db.executescript(SCHEMA)
+        pending = self.pending()
+        if pending:
+            log.info(f"⏸️ {len(pending)} دسته نیمه‌کاره در اجرای بعدی ادامه می‌یابد: {', '.join(pending)}")
+
+    def pending(self):
+        rows = self.db.query("SELECT batch FROM batch_checkpoints WHERE created_at > ?", (self.clock() - self.max_age,))
+        return [row[0] for row in rows]
+
+    def open(self, batch):
+        """Checkpoint دسته (با برنامه قبلی اگر نیمه‌کاره مانده) یا None اگر همین دسته در حال اجراست"""
+        with self.lock:
+            if batch in self.active:
+                return None
+            self.active.add(batch)
+        try:
+            rows = self.db.query("SELECT plan, cursor, created_at FROM batch_checkpoints WHERE batch = ?", (batch,))
+        except Exception:
+            self.release(batch)
+            raise
+        if not rows:
+            return Checkpoint(self, batch)
+        plan, cursor, created_at = rows[0]
+        if created_at <= self.clock() - self.max_age:
+            self.db.execute("DELETE FROM batch_checkpoints WHERE batch = ?", (batch,))
+            return Checkpoint(self, batch)
+        return Checkpoint(self, batch, json.loads(plan), cursor)
+
+    def release(self, batch):
+        with self.lock:
+            self.active.discard(batch)
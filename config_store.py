@@ -0,0 +1,108 @@
+import copy
+import json
+import logging
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from storage import atomic_write_json
+
+log = logging.getLogger(__name__)
+
+
+def freeze(value):
+    """تبدیل دیکشنری و لیست به نسخه فقط‌خواندنی"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """برگرداندن نسخه فقط‌خواندنی به دیکشنری و لیست معمولی"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigSnapshot(Mapping):
+    """نسخه تغییرناپذیر تنظیمات با شماره نسخه"""
+
+    def __init__(self, data, version):
+        self.data = freeze(data)
+        self.version = version
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def to_dict(self):
+        return thaw(self.data)
+
+
+class ConfigStore:
+    """تنظیمات config.json با نوشتن اتمی و snapshot بدون قفل برای خواننده‌ها
+
+    خواننده‌ها فقط snapshot فعلی را برمی‌دارند؛ هر تغییر یک snapshot تازه با
+    نسخه بالاتر می‌سازد و مشترک‌ها یک بار با آن صدا زده می‌شوند تا ساختارهای
+    وابسته را دوباره بسازند. اطلاع‌ها یکی‌یکی و همیشه با آخرین snapshot داده
+    می‌شوند تا به‌روزرسانی‌های هم‌زمان نسخه قدیمی‌تر را آخر از همه اعمال نکنند.
+    """
+
+    def __init__(self, path='config.json', defaults=None):
+        self.path = path
+        self.defaults = defaults or {}
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.snapshot = ConfigSnapshot(self._load(), 1)
+        self.notify_lock = threading.RLock()
+        self.notified = self.snapshot.version
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = copy.deepcopy(self.defaults)
+            atomic_write_json(self.path, data)
+            return data
+
+        for key, value in self.defaults.items():
+            data.setdefault(key, copy.deepcopy(value))
+        return data
+
+    def update(self, changes=None, **fields):
+        """اعمال تغییرات، ذخیره اتمی روی دیسک و اطلاع به مشترک‌ها"""
+        changes = dict(changes or {}, **fields)
+        with self.lock:
+            data = self.snapshot.to_dict()
+            data.update(copy.deepcopy(changes))
+            atomic_write_json(self.path, data)
+            self.snapshot = ConfigSnapshot(data, self.snapshot.version + 1)
+            snapshot = self.snapshot
+
+        with self.notify_lock:
+            # اگر نسخه جدیدتری زودتر اطلاع داده شده این نسخه دیگر اعمال نمی‌شود
+            latest = self.snapshot
+            if latest.version > self.notified:
+                self.notified = latest.version
+                for callback in list(self.subscribers):
+                    try:
+                        callback(latest)
+                    except Exception as e:
+                        log.warning(f"⚠️ خطا در به‌روزرسانی بعد از تغییر تنظیمات: {str(e)}")
+        return snapshot
+
+    def subscribe(self, callback):
+        """ثبت تابعی که با هر snapshot جدید (و یک بار همین حالا) صدا زده می‌شود"""
+        with self.notify_lock:
+            self.subscribers.append(callback)
+            callback(self.snapshot)
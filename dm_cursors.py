@@ -0,0 +1,62 @@
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dm_cursors (
+    thread_id TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    message_ts REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dm_cursors_updated_at ON dm_cursors (updated_at);
+"""
+
+
+class DirectCursorStore:
+    """آخرین پیام رسیدگی شده هر گفتگو تا به یک پیام دو بار پاسخ داده نشود
+
+    گفتگوهایی که مدت max_age_days تغییری نداشته‌اند و بیش از max_threads
+    گفتگو به صورت خودکار حذف می‌شوند تا جدول کوچک بماند.
+    """
+
+    def __init__(self, db, max_threads=500, max_age_days=30):
+        self.db = db
+        self.max_threads = max_threads
+        self.max_age = max_age_days * 86400
+        self.db.executescript(SCHEMA)
+        self.cursors = {
+            row[0]: (row[1], row[2])
+            for row in self.db.query("SELECT thread_id, message_id, message_ts FROM dm_cursors")
+        }
+
+    @staticmethod
+    def _timestamp(message):
+        return message.timestamp.timestamp() if message.timestamp else 0.0
+
+    def is_new(self, thread_id, message):
+        """آیا این پیام بعد از آخرین پیام رسیدگی شده گفتگو آمده است؟"""
+        cursor = self.cursors.get(str(thread_id))
+        if cursor is None:
+            return True
+        message_id, message_ts = cursor
+        return str(message.id) != message_id and self._timestamp(message) >= message_ts
+
+    def mark(self, thread_id, message):
+        thread_id = str(thread_id)
+        cursor = (str(message.id), self._timestamp(message))
+        self.db.execute(
+            "INSERT INTO dm_cursors VALUES (?, ?, ?, ?) ON CONFLICT(thread_id) DO UPDATE SET "
+            "message_id = excluded.message_id, message_ts = excluded.message_ts, updated_at = excluded.updated_at",
+            (thread_id, cursor[0], cursor[1], time.time())
+        )
+        self.cursors[thread_id] = cursor
+
+    def prune(self):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM dm_cursors WHERE updated_at < ?", (time.time() - self.max_age,))
+            conn.execute(
+                "DELETE FROM dm_cursors WHERE thread_id NOT IN "
+                "(SELECT thread_id FROM dm_cursors ORDER BY updated_at DESC LIMIT ?)",
+                (self.max_threads,)
+            )
+            kept = {row[0] for row in conn.execute("SELECT thread_id FROM dm_cursors")}
+        self.cursors = {thread_id: cursor for thread_id, cursor in self.cursors.items() if thread_id in kept}
@@ -0,0 +1,55 @@
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS engagements (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_engagements_expires_at ON engagements (expires_at);
+"""
+
+STORY_TTL = 86400
+MEDIA_TTL = 180 * 86400
+
+
+class EngagementIndex:
+    """شناسه استوری‌ها، کاربران و پست‌هایی که قبلا به آنها پاسخ یا کامنت داده شده
+
+    هر ورودی زمان انقضا دارد (استوری‌ها ۲۴ ساعت) و قبل از هر درخواست یا
+    عملیات بررسی می‌شود تا اجرای تکراری فقط برای محتوای جدید هزینه داشته
+    باشد. ورودی‌های منقضی با prune از حافظه و SQLite حذف می‌شوند.
+    """
+
+    def __init__(self, db, clock=time.time):
+        self.db = db
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.db.executescript(SCHEMA)
+        self.db.execute("DELETE FROM engagements WHERE expires_at <= ?", (int(self.clock()),))
+        self.entries = {}
+        for kind, key, expires_at in self.db.query("SELECT kind, key, expires_at FROM engagements"):
+            self.entries.setdefault(kind, {})[key] = expires_at
+
+    def seen(self, kind, key):
+        expires_at = self.entries.get(kind, {}).get(str(key))
+        return expires_at is not None and expires_at > self.clock()
+
+    def add(self, kind, key, ttl):
+        key = str(key)
+        expires_at = int(self.clock() + ttl)
+        with self.lock:
+            self.entries.setdefault(kind, {})[key] = expires_at
+        self.db.execute(
+            "INSERT INTO engagements VALUES (?, ?, ?) ON CONFLICT(kind, key) DO UPDATE SET expires_at = excluded.expires_at",
+            (kind, key, expires_at)
+        )
+
+    def prune(self):
+        now = self.clock()
+        self.db.execute("DELETE FROM engagements WHERE expires_at <= ?", (int(now),))
+        with self.lock:
+            for kind, entries in self.entries.items():
+                self.entries[kind] = {key: expires_at for key, expires_at in entries.items() if expires_at > now}
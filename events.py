@@ -0,0 +1,81 @@
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+
+
+def format_event(name, data, event_id=None):
+    """یک رویداد با قالب text/event-stream"""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    def __init__(self, max_pending):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+
+class EventBus:
+    """پخش رویدادها به همه اتصال‌های /events (Server-Sent Events)
+
+    هر رویداد یک بار قالب‌بندی و در صف هر مشترک گذاشته می‌شود. مشترکی که
+    عقب بماند قطع می‌شود؛ مرورگر خودش با Last-Event-ID دوباره وصل می‌شود و
+    رویدادهای جامانده از بافر آخر دوباره فرستاده می‌شوند.
+    """
+
+    def __init__(self, history=200, max_pending=500):
+        self.ids = itertools.count(1)
+        self.history = deque(maxlen=history)
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, name, data):
+        with self.lock:
+            event_id = next(self.ids)
+            payload = format_event(name, data, event_id)
+            self.history.append((event_id, payload))
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.queue.put_nowait(payload)
+                except queue.Full:
+                    subscriber.overflowed = True
+                    self.subscribers.discard(subscriber)
+
+    def subscribe(self, last_event_id=None):
+        subscriber = Subscriber(self.max_pending)
+        with self.lock:
+            if last_event_id is not None:
+                for event_id, payload in self.history:
+                    if event_id > last_event_id:
+                        subscriber.queue.put_nowait(payload)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def stream(self, last_event_id=None, initial=(), heartbeat=15):
+        """ژنراتور بدنه پاسخ /events؛ تا قطع شدن اتصال ادامه دارد"""
+        subscriber = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            yield from initial
+            while True:
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    if subscriber.overflowed:
+                        return
+                    # کامنت خالی تا پروکسی‌ها اتصال بی‌کار را نبندند
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,188 @@
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+
+class FakeClient:
+    """جایگزین محلی Client در instagrapi برای اجرای ربات بدون حساب واقعی
+
+    فقط متدهایی که AdvancedInstagramBot استفاده می‌کند پیاده‌سازی شده‌اند.
+    تأخیر هر درخواست (latency)، نرخ خطا (error_rate) و اندازه داده‌ها قابل
+    تنظیم است و تعداد فراخوانی هر متد در calls شمرده می‌شود.
+    """
+
+    def __init__(self, followers=200, own_followers=100, medias=20, threads=20, story_ratio=0.5,
+                 follow_back_ratio=0.3, latency=0.0, error_rate=0.0, seed=None):
+        self.random = random.Random(seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.injected = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.sizes = {"followers": followers, "medias": medias, "threads": threads}
+        self.story_ratio = story_ratio
+        self.follow_back_ratio = follow_back_ratio
+
+        self.user_id = None
+        self.username = None
+        self.settings = {}
+        self.proxy = None
+        self.following = set()
+        self.my_followers = {str(pk): self._user(pk) for pk in range(900_000_000, 900_000_000 + own_followers)}
+        self.comments = []
+        self.reactions = []
+        self.sent = []
+        self.threads = [self._thread(i) for i in range(threads)]
+
+    # --- کنترل رفتار ---
+
+    def inject(self, method, error, times=1):
+        """خطای error برای times فراخوانی بعدی method (None یعنی همیشه)"""
+        self.injected[method] = [error, times]
+
+    def _call(self, method):
+        with self.lock:
+            self.calls[method] += 1
+            injected = self.injected.get(method)
+            if injected:
+                error, times = injected
+                if times is not None:
+                    injected[1] -= 1
+                    if injected[1] <= 0:
+                        del self.injected[method]
+                raise error if isinstance(error, BaseException) else error()
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if self.latency:
+            if isinstance(self.latency, tuple):
+                time.sleep(self.random.uniform(*self.latency))
+            else:
+                time.sleep(self.latency)
+        if failed:
+            raise ConnectionError(f"fake {method} failure")
+
+    # --- داده‌های ساختگی ---
+
+    @staticmethod
+    def _user(pk):
+        return SimpleNamespace(pk=str(pk), username=f"user{pk}", full_name=f"User {pk}")
+
+    def _thread(self, index):
+        message = SimpleNamespace(
+            id=str(10_000 + index),
+            user_id=str(500 + index),
+            thread_id=f"thread{index}",
+            text=self.random.choice(["سلام", "قیمت چنده؟", "ممنون", "hi", "همکاری"]),
+            timestamp=datetime.now() - timedelta(minutes=index)
+        )
+        return SimpleNamespace(id=f"thread{index}", pk=f"thread{index}", messages=[message])
+
+    # --- ورود و نشست ---
+
+    def login(self, username, password):
+        self._call("login")
+        self.username = username
+        self.user_id = "1"
+        self.settings = {"uuids": {"uuid": "fake"}, "authorization_data": {"ds_user_id": "1"}}
+        return True
+
+    def get_settings(self):
+        return dict(self.settings)
+
+    def set_settings(self, settings):
+        self.settings = dict(settings)
+        self.user_id = settings.get("authorization_data", {}).get("ds_user_id")
+        return True
+
+    def set_uuids(self, uuids):
+        self.settings["uuids"] = uuids
+        return True
+
+    def set_proxy(self, dsn):
+        self.proxy = dsn
+        return True
+
+    def account_info(self):
+        self._call("account_info")
+        return SimpleNamespace(
+            pk=self.user_id or "1",
+            username=self.username or "fake_account",
+            follower_count=len(self.my_followers),
+            following_count=len(self.following)
+        )
+
+    # --- کاربران ---
+
+    def user_id_from_username(self, username):
+        self._call("user_id_from_username")
+        return str(zlib.crc32(username.encode("utf-8")) % 10**9)
+
+    def user_followers(self, user_id, amount=0):
+        self._call("user_followers")
+        if str(user_id) == self.user_id:
+            followers = self.my_followers
+        else:
+            size = self.sizes["followers"]
+            base = int(user_id) % 10**6 * 10**4
+            followers = {str(base + i): self._user(base + i) for i in range(size)}
+        if amount:
+            return dict(list(followers.items())[:amount])
+        return dict(followers)
+
+    def user_follow(self, user_id):
+        self._call("user_follow")
+        user_id = str(user_id)
+        self.following.add(user_id)
+        if self.random.random() < self.follow_back_ratio:
+            self.my_followers[user_id] = self._user(user_id)
+        return True
+
+    def user_unfollow(self, user_id):
+        self._call("user_unfollow")
+        self.following.discard(str(user_id))
+        return True
+
+    def user_friendship(self, user_id):
+        self._call("user_friendship")
+        user_id = str(user_id)
+        return SimpleNamespace(
+            user_id=user_id,
+            following=user_id in self.following,
+            followed_by=user_id in self.my_followers
+        )
+
+    # --- پست، استوری و دایرکت ---
+
+    def user_medias(self, user_id, amount=20):
+        self._call("user_medias")
+        count = min(amount or self.sizes["medias"], self.sizes["medias"])
+        return [SimpleNamespace(id=f"{user_id}_{i}", pk=f"{user_id}{i}", user=self._user(user_id))
+                for i in range(count)]
+
+    def media_comment(self, media_id, text):
+        self._call("media_comment")
+        self.comments.append((media_id, text))
+        return SimpleNamespace(pk=str(len(self.comments)), text=text)
+
+    def user_stories(self, user_id, amount=None):
+        self._call("user_stories")
+        if int(user_id) % 100 >= self.story_ratio * 100:
+            return []
+        return [SimpleNamespace(id=f"{user_id}_story{i}", pk=f"{user_id}{i}") for i in range(2)]
+
+    def story_react(self, story_id, emoji):
+        self._call("story_react")
+        self.reactions.append((story_id, emoji))
+        return True
+
+    def direct_threads(self, amount=20):
+        self._call("direct_threads")
+        return self.threads[:amount] if amount else list(self.threads)
+
+    def direct_send(self, text, user_ids=None, thread_ids=None):
+        self._call("direct_send")
+        self.sent.append((tuple(thread_ids or ()), text))
+        return SimpleNamespace(id=str(len(self.sent)), text=text)
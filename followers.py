@@ -0,0 +1,36 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class FollowerSnapshot:
+    """مجموعه pk فالوورهای خود اکانت که حداکثر یک بار در هر دوره ttl گرفته می‌شود
+
+    به جای یک درخواست user_friendship برای هر کاربر، فالو بک با عضویت در
+    این مجموعه بررسی می‌شود. فالو و آنفالو خود ربات فالوورهای اکانت را عوض
+    نمی‌کند و تغییر آنها از طرف دیگران دیده نمی‌شود، پس تا ttl کهنه بودن
+    پذیرفته شده است: آنفالو روزانه با فاصله‌ای بیشتر از ttl اجرا می‌شود و
+    همیشه مجموعه تازه می‌گیرد. با ورود اکانت دیگر invalidate صدا زده می‌شود.
+    """
+
+    def __init__(self, fetch, ttl=3600, clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.pks = frozenset()
+        self.fetched_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.fetched_at is None or self.clock() - self.fetched_at >= self.ttl:
+                self.pks = frozenset(str(pk) for pk in self.fetch())
+                self.fetched_at = self.clock()
+                log.info(f"👥 {len(self.pks)} فالوور دریافت شد")
+            return self.pks
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = None
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# متدهایی از ربات که workerها می‌توانند صدا بزنند؛ همه فقط داده ساده برمی‌گردانند
+EXPOSED = frozenset({
+    "login",
+    "submit_job",
+    "quota_remaining",
+    "get_config",
+    "update_config",
+    "list_jobs",
+    "get_job",
+    "start_scheduled_services",
+    "pause_scheduled_services",
+    "get_stats",
+    "set_job_profiling",
+    "profiling_status",
+    "memory_control",
+    "memory_report",
+})
+
+
+def _is_http_metric(name):
+    return name.startswith("http_")
+
+
+class BotServer:
+    """پروسه مالک: ربات، زمان‌بند و دفتر فالوها فقط اینجا زندگی می‌کنند
+
+    workerهای HTTP از طریق سوکت Unix درخواست (نام متد، آرگومان‌ها) می‌فرستند
+    و نتیجه را می‌گیرند. هر اتصال یک نخ دارد؛ /events روی اتصال جداگانه خود
+    به صورت جریان فرستاده می‌شود.
+    """
+
+    def __init__(self, bot, address, authkey=None):
+        self.bot = bot
+        self.address = address
+        self.authkey = authkey
+        if os.path.exists(address):
+            os.unlink(address)
+        self.listener = Listener(address, family='AF_UNIX', authkey=authkey)
+        # فقط کاربر همین پروسه اجازه اتصال دارد
+        os.chmod(address, 0o600)
+
+    def serve_forever(self):
+        log.info(f"🔌 پروسه مالک ربات روی {self.address} آماده است")
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            except Exception as e:
+                log.warning(f"⚠️ اتصال رد شد: {str(e)}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), name="ipc", daemon=True).start()
+
+    def close(self):
+        self.listener.close()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    name, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if name == "event_stream":
+                    self._stream(conn, *args)
+                    return
+                try:
+                    conn.send(("ok", self._dispatch(name, args, kwargs)))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    conn.send(("error", e))
+
+    def _dispatch(self, name, args, kwargs):
+        if name == "is_logged_in":
+            return self.bot.is_logged_in
+        if name == "render_metrics":
+            return metrics.registry.render(lambda metric_name: not _is_http_metric(metric_name))
+        if name not in EXPOSED:
+            raise AttributeError(name)
+        return getattr(self.bot, name)(*args, **kwargs)
+
+    def _stream(self, conn, last_event_id):
+        stream = self.bot.event_stream(last_event_id)
+        try:
+            for chunk in stream:
+                conn.send(chunk)
+        except (EOFError, OSError):
+            pass
+        finally:
+            stream.close()
+
+
+class RemoteBot:
+    """ربات در پروسه worker: همان متدهای مورد استفاده routeها، از طریق سوکت مالک
+
+    هر نخ اتصال خودش را دارد؛ اگر مالک ری‌استارت شده باشد و ارسال درخواست
+    شکست بخورد یک بار دوباره وصل می‌شود.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self.local = threading.local()
+
+    def _connect(self):
+        return Client(self.address, family='AF_UNIX', authkey=self.authkey)
+
+    def _call(self, name, *args, **kwargs):
+        for attempt in range(2):
+            conn = getattr(self.local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self.local.conn = self._connect()
+                conn.send((name, args, kwargs))
+                break
+            except (EOFError, OSError):
+                self.local.conn = None
+                if attempt:
+                    raise
+        # بعد از ارسال موفق دوباره امتحان نمی‌شود؛ مالک ممکن است متد (مثلا
+        # submit_job یا login) را اجرا کرده باشد
+        try:
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self.local.conn = None
+            raise
+        if status == "error":
+            raise value
+        return value
+
+    def __getattr__(self, name):
+        if name not in EXPOSED:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+    @property
+    def is_logged_in(self):
+        return self._call("is_logged_in")
+
+    def render_metrics(self):
+        # متریک‌های ربات از مالک و متریک‌های HTTP از همین worker
+        return self._call("render_metrics") + metrics.registry.render(_is_http_metric)
+
+    def event_stream(self, last_event_id=None):
+        conn = self._connect()
+        try:
+            conn.send(("event_stream", (last_event_id,), {}))
+            while True:
+                yield conn.recv()
+        except EOFError:
+            return
+        finally:
+            conn.close()
@@ -0,0 +1,159 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import logs
+import metrics
+
+
+class Job:
+    """یک کار پس‌زمینه همراه با وضعیت، پیشرفت و نتیجه"""
+
+    def __init__(self, name, params=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.params = params or {}
+        self.state = "queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.started_monotonic = None
+
+    def set_progress(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    @property
+    def finished(self):
+        return self.state in ("finished", "failed")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "state": self.state,
+            "progress": {"done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    """صف کارهای پس‌زمینه با تعداد محدود کارگر
+
+    کارهایی که ژنراتور گام‌ها برمی‌گردانند به pacer سپرده می‌شوند تا بین
+    عملیات‌ها هیچ نخی مسدود نماند. با ساعت مجازی کار همان‌جا شروع می‌شود تا
+    گام‌هایش پیش از advance() بعدی در صف pacer باشند.
+    """
+
+    def __init__(self, pacer=None, max_workers=2, keep_finished=100):
+        self.pacer = pacer
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.listeners = []
+        # فقط وقتی کاری برای پروفایل انتخاب شده مقدار دارد (profiling.Profiler)
+        self.profiler = None
+
+    def submit(self, name, func, *args, **params):
+        """ثبت کار در صف و برگرداندن فوری آن
+
+        تابع باید آرگومان progress را بپذیرد تا پیشرفت کار را گزارش کند.
+        """
+        job = Job(name, params)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self._notify("queued", job)
+        if self.pacer is not None and self.pacer.virtual:
+            self._run(job, func, args, params)
+        else:
+            self.executor.submit(self._run, job, func, args, params)
+        return job
+
+    def _run(self, job, func, args, params):
+        job.state = "running"
+        job.started_at = datetime.now().isoformat()
+        job.started_monotonic = time.monotonic()
+        self._notify("started", job)
+        
+        def progress(done, total=None):
+            job.set_progress(done, total)
+            self._notify("progress", job)
+        
+        if self.profiler is not None:
+            func = self.profiler.wrap_job(job.name, func)
+        
+        with logs.bind(task=job.name, job_id=job.id, started=job.started_monotonic):
+            try:
+                result = func(*args, progress=progress, **params)
+            except Exception as e:
+                self._finish(job, error=e)
+                return
+            
+            if self.pacer is not None and hasattr(result, "send"):
+                self.pacer.spawn(result, on_done=lambda task: self._finish(job, task.result, task.error))
+            else:
+                self._finish(job, result)
+
+    def _finish(self, job, result=None, error=None):
+        if error is not None:
+            job.error = str(error)
+            job.state = "failed"
+        else:
+            job.result = result
+            job.state = "finished"
+        job.finished_at = datetime.now().isoformat()
+        
+        outcome = job.state
+        if job.state == "finished" and isinstance(result, dict) and result.get("status") == "error":
+            outcome = "error"
+        metrics.JOB_RUNS.inc(name=job.name, outcome=outcome)
+        metrics.JOB_DURATION.observe(time.monotonic() - job.started_monotonic, name=job.name)
+        self._notify("finished", job)
+    
+    def subscribe(self, listener):
+        """ثبت تابعی که با (رویداد، کار) برای queued/started/progress/finished صدا زده می‌شود"""
+        self.listeners.append(listener)
+    
+    def _notify(self, event, job):
+        for listener in self.listeners:
+            listener(event, job)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    def active(self, name):
+        """آیا کاری با این نام در صف یا در حال اجراست؟"""
+        with self.lock:
+            return any(job.name == name and not job.finished for job in self.jobs.values())
+
+    def queue_depth(self):
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job.state == "queued")
+
+    def running(self):
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job.state == "running")
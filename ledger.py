@@ -0,0 +1,390 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from datetime import datetime
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS followed_users (
+    pk TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    follow_date TEXT NOT NULL,
+    source_account TEXT,
+    followed_back INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_followed_users_follow_date ON followed_users (follow_date);
+DROP INDEX IF EXISTS idx_followed_users_source_account;
+"""
+
+
+FOLLOWED_BACK = 1
+
+# درخت دو سطحی 64×64 برگ؛ هر نوشتن بعد از یک snapshot حداکثر دو لیست 64تایی و
+# یک برگ (حدود n/4096 رکورد) را کپی می‌کند
+FANOUT_BITS = 6
+FANOUT = 1 << FANOUT_BITS
+LEAF_MASK = FANOUT * FANOUT - 1
+
+
+class _Node:
+    """گره درخت حافظه؛ فقط گره‌های epoch جاری قابل تغییرند"""
+
+    __slots__ = ("epoch", "slots")
+
+    def __init__(self, epoch, slots):
+        self.epoch = epoch
+        self.slots = slots
+
+
+# زیردرخت خالی مشترک با epoch منفی که هرگز تغییر نمی‌کند و قبل از نوشتن کپی می‌شود
+_EMPTY_LEAF = _Node(-1, {})
+_EMPTY_INNER = _Node(-1, [_EMPTY_LEAF] * FANOUT)
+
+
+def _path(pk):
+    index = hash(pk) & LEAF_MASK
+    return index >> FANOUT_BITS, index & (FANOUT - 1)
+
+
+class FollowRecord(Mapping):
+    """رکورد فشرده و تغییرناپذیر دفتر که مثل همان دیکشنری قبلی خوانده می‌شود
+
+    تاریخ فالو epoch صحیح است، source_account رشته مشترک (intern شده) بین
+    همه رکوردهای یک منبع است و followed_back یک بیت از flags است.
+    """
+
+    __slots__ = ("username", "follow_ts", "source_account", "flags")
+    FIELDS = ("username", "follow_date", "source_account", "followed_back")
+
+    def __init__(self, username, follow_ts, source_account, flags):
+        self.username = username
+        self.follow_ts = follow_ts
+        self.source_account = source_account
+        self.flags = flags
+
+    @property
+    def follow_date(self):
+        return datetime.fromtimestamp(self.follow_ts).isoformat()
+
+    @property
+    def followed_back(self):
+        return bool(self.flags & FOLLOWED_BACK)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class LedgerSnapshot(Mapping):
+    """نسخه فقط‌خواندنی دفتر که گره‌هایش با خود دفتر مشترک است
+
+    دفتر گره‌های epoch قبلی را هرگز تغییر نمی‌دهد و قبل از اولین تغییر از
+    آنها کپی می‌گیرد (path copying)، پس این نسخه هرگز عوض نمی‌شود.
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self, root, size):
+        self.root = root
+        self.size = size
+
+    def __getitem__(self, pk):
+        inner, leaf = _path(pk)
+        return self.root.slots[inner].slots[leaf].slots[pk]
+
+    def __contains__(self, pk):
+        inner, leaf = _path(pk)
+        return pk in self.root.slots[inner].slots[leaf].slots
+
+    def __iter__(self):
+        for leaf in self._leaves():
+            yield from leaf
+
+    def __len__(self):
+        return self.size
+
+    def _leaves(self):
+        for inner in self.root.slots:
+            for leaf in inner.slots:
+                if leaf.slots:
+                    yield leaf.slots
+
+    def items(self):
+        return _SnapshotItems(self)
+
+    def values(self):
+        return _SnapshotValues(self)
+
+
+class _SnapshotItems(ItemsView):
+    """پیمایش مستقیم برگ‌ها به جای جستجوی جداگانه هر کلید"""
+
+    def __iter__(self):
+        for leaf in self._mapping._leaves():
+            yield from leaf.items()
+
+
+class _SnapshotValues(ValuesView):
+    def __iter__(self):
+        for leaf in self._mapping._leaves():
+            yield from leaf.values()
+
+
+class FollowLedger(MutableMapping):
+    """دفتر کاربران فالو شده با همان رابط دیکشنری followed_users
+
+    هر درج، تغییر یا حذف جداگانه و به صورت اتمی در SQLite ثبت می‌شود و
+    یک نسخه در حافظه برای خواندن سریع نگه داشته می‌شود. زمان فالو هر رکورد
+    (epoch) در یک min-heap نگه داشته می‌شود تا آنفالو فقط رکوردهای سررسید
+    شده را ببیند. رکوردهای حافظه FollowRecord فشرده هستند.
+
+    همه تغییرها پشت یک قفل نویسنده انجام می‌شوند و رکوردها تغییرناپذیرند.
+    write_lock همیشه پیش از قفل پایگاه داده گرفته می‌شود و حافظه بعد از COMMIT
+    تغییر می‌کند.
+    پیمایش (iter، values، items، to_dict) روی snapshot انجام می‌شود. رکوردها
+    در برگ‌های یک درخت دو سطحی هستند و snapshot فقط ارجاع به ریشه و شروع
+    epoch جدید است (O(1)). اولین نوشتن در هر مسیر بعد از آن فقط گره‌های همان
+    مسیر را کپی می‌کند، نه کل دفتر را. خواننده‌ها هرگز منتظر
+    نوشتن SQLite نمی‌مانند و وسط پیمایش تغییری نمی‌بینند.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        self.epoch = 0
+        self.root = _Node(-1, [_EMPTY_INNER] * FANOUT)
+        self.size = 0
+        self.sources = {}
+        self.listeners = []
+        self.write_lock = threading.RLock()
+        # فقط دور تغییر حافظه و ساختن snapshot؛ هرگز هنگام نوشتن SQLite گرفته نمی‌شود
+        self.tree_lock = threading.Lock()
+        self.version = 0
+        self.cached_snapshot = (-1, None)
+        leaves = {}
+        for row in self.db.query("SELECT pk, username, follow_date, source_account, followed_back FROM followed_users"):
+            leaves.setdefault(hash(row[0]) & LEAF_MASK, {})[row[0]] = self._record(row[1:])
+            self.size += 1
+        for index, records in leaves.items():
+            inner = self.root.slots[index >> FANOUT_BITS]
+            if inner.epoch != self.epoch:
+                inner = self.root.slots[index >> FANOUT_BITS] = _Node(self.epoch, list(inner.slots))
+            inner.slots[index & (FANOUT - 1)] = _Node(self.epoch, records)
+        # کاربرانی که فالو بک کرده‌اند هرگز آنفالو نمی‌شوند و در صف نمی‌مانند
+        self.due_heap = [
+            (record.follow_ts, pk) for records in leaves.values() for pk, record in records.items()
+            if not record.followed_back
+        ]
+        heapq.heapify(self.due_heap)
+
+    def _record(self, row):
+        username, follow_date, source_account, followed_back = row
+        if source_account is not None:
+            source_account = self.sources.setdefault(source_account, source_account)
+        return FollowRecord(username, self._epoch(follow_date), source_account,
+                            FOLLOWED_BACK if followed_back else 0)
+
+    @staticmethod
+    def _epoch(follow_date):
+        return int(datetime.fromisoformat(follow_date).timestamp())
+
+    def _get(self, pk):
+        inner, leaf = _path(pk)
+        return self.root.slots[inner].slots[leaf].slots.get(pk)
+
+    def _writable_leaf(self, pk):
+        """برگ رکورد pk؛ گره‌های epoch قبلی مسیر اول کپی می‌شوند (با tree_lock)"""
+        epoch = self.epoch
+        inner_index, leaf_index = _path(pk)
+        root = self.root
+        if root.epoch != epoch:
+            root = self.root = _Node(epoch, list(root.slots))
+        inner = root.slots[inner_index]
+        if inner.epoch != epoch:
+            inner = root.slots[inner_index] = _Node(epoch, list(inner.slots))
+        leaf = inner.slots[leaf_index]
+        if leaf.epoch != epoch:
+            leaf = inner.slots[leaf_index] = _Node(epoch, dict(leaf.slots))
+        return leaf.slots
+
+    def _commit(self, pk, change):
+        """اعمال change روی حافظه فقط بعد از ثبت تراکنش بیرونی
+
+        وقتی نوشتن داخل تراکنش دیگری است (مثل Checkpoint.step) حافظه تا COMMIT
+        آن عوض نمی‌شود و با ROLLBACK اصلا عوض نمی‌شود.
+        """
+        def apply():
+            with self.write_lock:
+                change()
+                self.version += 1
+            self._notify(pk)
+        self.db.after_commit(apply)
+
+    def _put(self, pk, record):
+        with self.tree_lock:
+            leaf = self._writable_leaf(pk)
+            old = leaf.get(pk)
+            leaf[pk] = record
+            if old is None:
+                self.size += 1
+        if record.followed_back:
+            return
+        if old is None or old.follow_ts != record.follow_ts or old.followed_back:
+            heapq.heappush(self.due_heap, (record.follow_ts, pk))
+
+    def _remove(self, pk):
+        # ورودی heap به صورت تنبل و هنگام برداشتن حذف می‌شود
+        with self.tree_lock:
+            if self._writable_leaf(pk).pop(pk, None) is not None:
+                self.size -= 1
+
+    @staticmethod
+    def _row(pk, data):
+        return (str(pk), data["username"], data["follow_date"],
+                data.get("source_account"), int(bool(data.get("followed_back"))))
+
+    def migrate_json(self, path='followed_users.json'):
+        """انتقال یک‌باره followed_users.json قدیمی به پایگاه داده"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ فایل {path} قابل خواندن نیست: {str(e)}")
+            return 0
+
+        with self.write_lock:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO followed_users VALUES (?, ?, ?, ?, ?)",
+                    [self._row(pk, record) for pk, record in data.items()]
+                )
+            for pk, record in data.items():
+                row = self._row(pk, record)
+                if self._get(row[0]) is None:
+                    self._put(row[0], self._record(row[1:]))
+            self.version += 1
+        self._notify(None)
+        os.replace(path, path + '.migrated')
+        log.info(f"✅ {len(data)} رکورد از {path} منتقل شد")
+        return len(data)
+
+    def __getitem__(self, pk):
+        record = self._get(str(pk))
+        if record is None:
+            raise KeyError(pk)
+        return record
+
+    def __setitem__(self, pk, data):
+        row = self._row(pk, data)
+        with self.write_lock:
+            start = time.perf_counter()
+            with self.db.transaction() as conn:
+                conn.execute(
+                    "INSERT INTO followed_users VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(pk) DO UPDATE SET username = excluded.username, "
+                    "follow_date = excluded.follow_date, source_account = excluded.source_account, "
+                    "followed_back = excluded.followed_back",
+                    row
+                )
+                self._commit(row[0], lambda: self._put(row[0], self._record(row[1:])))
+            metrics.LEDGER_WRITE_LATENCY.observe(time.perf_counter() - start, operation="upsert")
+
+    def __delitem__(self, pk):
+        pk = str(pk)
+        with self.write_lock:
+            if self._get(pk) is None:
+                raise KeyError(pk)
+            start = time.perf_counter()
+            with self.db.transaction() as conn:
+                conn.execute("DELETE FROM followed_users WHERE pk = ?", (pk,))
+                self._commit(pk, lambda: self._remove(pk))
+            metrics.LEDGER_WRITE_LATENCY.observe(time.perf_counter() - start, operation="delete")
+
+    def subscribe(self, listener):
+        """ثبت تابعی که بعد از هر تغییر دفتر با pk تغییر کرده صدا زده می‌شود"""
+        self.listeners.append(listener)
+
+    def _notify(self, pk):
+        for listener in self.listeners:
+            listener(pk)
+
+    def pop_due(self, cutoff):
+        """برداشتن کاربرانی که قبل از cutoff (epoch) فالو شده‌اند، قدیمی‌ترین اول
+
+        هزینه O(k log n) برای k رکورد سررسید شده است؛ رکوردهایی که باید در
+        دفتر بمانند با requeue دوباره به صف برمی‌گردند. رکوردهای followed_back
+        برگردانده نمی‌شوند و از صف حذف می‌شوند.
+        """
+        due = []
+        with self.write_lock:
+            while self.due_heap and self.due_heap[0][0] <= cutoff:
+                ts, pk = heapq.heappop(self.due_heap)
+                record = self._get(pk)
+                if record is not None and record.follow_ts == ts and not record.followed_back:
+                    due.append(pk)
+        return due
+
+    def requeue(self, pk):
+        pk = str(pk)
+        with self.write_lock:
+            record = self._get(pk)
+            if record is not None and not record.followed_back:
+                heapq.heappush(self.due_heap, (record.follow_ts, pk))
+
+    def set_fields(self, pk, **fields):
+        """تغییر چند فیلد از یک رکورد موجود (خواندن و نوشتن با هم اتمی است)"""
+        with self.write_lock:
+            record = dict(self[pk])
+            record.update(fields)
+            self[pk] = record
+
+    def snapshot(self):
+        """نسخه فقط‌خواندنی و سازگار کل دفتر، بدون گرفتن قفل نویسنده"""
+        version, snapshot = self.cached_snapshot
+        current = self.version
+        if version == current:
+            return snapshot
+        # نسخه قبل از گرفتن ریشه خوانده شده تا snapshot قدیمی با شماره
+        # نسخه جدید کش نشود
+        with self.tree_lock:
+            snapshot = LedgerSnapshot(self.root, self.size)
+            self.epoch += 1
+        self.cached_snapshot = (current, snapshot)
+        return snapshot
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return self.size
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    def items(self):
+        return self.snapshot().items()
+
+    def values(self):
+        return self.snapshot().values()
+
+    def to_dict(self):
+        return {pk: dict(record) for pk, record in self.snapshot().items()}
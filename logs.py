@@ -0,0 +1,117 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+# اطلاعات کار جاری (نام کار، شناسه job و ...) که به همه لاگ‌ها اضافه می‌شود
+log_context = ContextVar("log_context", default={})
+
+RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+@contextmanager
+def bind(**fields):
+    """افزودن فیلدها به لاگ‌های داخل این بلوک (در همین نخ یا گام pacer)"""
+    token = log_context.set({**log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """کپی context فعلی روی رکورد، قبل از اینکه رکورد وارد صف شود"""
+
+    def filter(self, record):
+        context = log_context.get()
+        for key, value in context.items():
+            if key == "started":
+                if not hasattr(record, "elapsed"):
+                    record.elapsed = round(time.monotonic() - value, 3)
+            elif not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """مثل QueueHandler، ولی traceback را جدا از پیام در فیلد exception نگه می‌دارد"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """هر رکورد یک خط JSON؛ پیام فارسی در فیلد message می‌ماند"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=None, path=None, max_bytes=None, backup_count=5):
+    """راه‌اندازی لاگ غیرمسدودکننده: نخ‌ها فقط در صف می‌نویسند و یک listener
+    در پس‌زمینه خطوط JSON را به stdout و فایل چرخشی می‌نویسد.
+
+    تنظیمات پیش‌فرض از متغیرهای LOG_LEVEL، LOG_FILE و LOG_MAX_BYTES خوانده می‌شود؛
+    با path خالی فقط در stdout نوشته می‌شود.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    path = path if path is not None else os.getenv("LOG_FILE", "bot.log")
+    max_bytes = max_bytes or int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if path:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # صف بدون سقف: نوشتن لاگ هرگز حلقه عملیات را منتظر نمی‌گذارد
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """خالی کردن صف و توقف listener (هنگام خروج)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
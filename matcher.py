@@ -0,0 +1,92 @@
+import unicodedata
+
+# یکسان‌سازی حروف عربی و فارسی
+CHAR_MAP = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+})
+
+# اعراب، نیم‌فاصله، کشیده و نویسه‌های جهت‌دار حذف می‌شوند
+REMOVED_CHARS = dict.fromkeys(
+    [*range(0x064B, 0x0660), 0x0670, 0x200C, 0x200D, 0x200E, 0x200F, 0x0640], None
+)
+
+
+def normalize(text):
+    """یکسان‌سازی متن فارسی برای مقایسه کلمات کلیدی
+
+    حروف عربی ي/ك به ی/ک تبدیل و اعراب، نیم‌فاصله و کشیده حذف می‌شوند.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return text.translate(CHAR_MAP).translate(REMOVED_CHARS)
+
+
+class KeywordMatcher:
+    """پیدا کردن کلمه کلیدی پیام با الگوریتم Aho-Corasick در یک پیمایش
+
+    اگر چند کلمه کلیدی در پیام باشد، کلمه‌ای که در تنظیمات زودتر آمده
+    برنده است (همان رفتار حلقه قبلی).
+    """
+
+    def __init__(self, responses):
+        self.replies = []
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+
+        for priority, (keyword, reply) in enumerate(responses.items()):
+            keyword = normalize(keyword)
+            self.replies.append(reply)
+            if not keyword:
+                continue
+            node = 0
+            for ch in keyword:
+                next_node = self.goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][ch] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = next_node
+            if self.best[node] is None or priority < self.best[node]:
+                self.best[node] = priority
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                # بهترین کلمه‌ای که در این گره یا پسوندهایش تمام می‌شود
+                inherited = self.best[self.fail[child]]
+                if inherited is not None and (self.best[child] is None or inherited < self.best[child]):
+                    self.best[child] = inherited
+                queue.append(child)
+
+    def match(self, text):
+        """پاسخ مربوط به کلمه کلیدی با بیشترین اولویت، یا None"""
+        goto, fail, best = self.goto, self.fail, self.best
+        found = None
+        node = 0
+        for ch in normalize(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            priority = best[node]
+            if priority is not None and (found is None or priority < found):
+                found = priority
+                if found == 0:
+                    break
+        return None if found is None else self.replies[found]
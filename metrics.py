@@ -0,0 +1,220 @@
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(Metric):
+    """مقدار لحظه‌ای؛ یا با set تنظیم می‌شود یا هنگام خواندن از تابع گرفته می‌شود"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                return [f"{self.name} {_format_value(self.function())}"]
+            except Exception:
+                return []
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self.values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, include=None):
+        """متن Prometheus؛ include (تابعی روی نام متریک) فقط بخشی از متریک‌ها را نگه می‌دارد"""
+        lines = []
+        for metric in self.metrics:
+            if include is None or include(metric.name):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "Flask requests by endpoint, method and status", ("endpoint", "method", "status")))
+HTTP_ERRORS = registry.register(Counter(
+    "http_request_errors_total", "Unhandled exceptions in Flask routes", ("endpoint", "exception")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Flask request latency", ("endpoint",)))
+
+CLIENT_CALLS = registry.register(Counter(
+    "instagram_client_calls_total", "Calls made to the instagrapi client", ("method",)))
+CLIENT_ERRORS = registry.register(Counter(
+    "instagram_client_errors_total", "Failed instagrapi client calls by exception type", ("method", "exception")))
+CLIENT_LATENCY = registry.register(Histogram(
+    "instagram_client_call_duration_seconds", "Upstream latency of instagrapi client calls", ("method",)))
+
+JOB_RUNS = registry.register(Counter(
+    "bot_jobs_total", "Finished background jobs by name and outcome", ("name", "outcome")))
+JOB_DURATION = registry.register(Histogram(
+    "bot_job_duration_seconds", "Wall time of background jobs including pacing", ("name",)))
+SCHEDULER_RUNS = registry.register(Counter(
+    "scheduler_runs_total", "APScheduler trigger runs by job and outcome", ("job", "outcome")))
+PACING_SECONDS = registry.register(Counter(
+    "pacer_delay_seconds_total", "Total delay scheduled between actions by the pacer"))
+LEDGER_WRITE_LATENCY = registry.register(Histogram(
+    "ledger_write_duration_seconds", "Local SQLite write latency of the follow ledger", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)))
+
+LEDGER_SIZE = registry.register(Gauge("ledger_entries", "Entries in the follow ledger"))
+JOB_QUEUE_DEPTH = registry.register(Gauge("bot_job_queue_depth", "Jobs waiting for a worker"))
+JOBS_RUNNING = registry.register(Gauge("bot_jobs_running", "Jobs currently running"))
+PACER_PENDING = registry.register(Gauge("pacer_pending_tasks", "Batches waiting in the pacer queue"))
+
+
+class InstrumentedClient:
+    """پوشش Client که تعداد، خطا و زمان هر فراخوانی را ثبت می‌کند"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+
+        def call(*args, **kwargs):
+            CLIENT_CALLS.inc(method=name)
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            except Exception as e:
+                CLIENT_ERRORS.inc(method=name, exception=type(e).__name__)
+                raise
+            finally:
+                CLIENT_LATENCY.observe(time.perf_counter() - start, method=name)
+        return call
+
+    def __setattr__(self, name, value):
+        if name == "_client":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._client, name, value)
+
+
+def instrument_app(app):
+    """ثبت تعداد و زمان همه درخواست‌های Flask"""
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        endpoint = request.endpoint or "unknown"
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        if "metrics_start" in g:
+            HTTP_LATENCY.observe(time.perf_counter() - g.metrics_start, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def record_error(error):
+        if error is not None:
+            HTTP_ERRORS.inc(endpoint=request.endpoint or "unknown", exception=type(error).__name__)
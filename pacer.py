@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+import logs
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+class RealClock:
+    """ساعت واقعی سیستم"""
+
+    def now(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+
+class VirtualClock:
+    """ساعت مجازی برای اجرای سریع یک روز کامل کار زمان‌بندی شده در تست‌ها"""
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.elapsed = 0.0
+
+    def now(self):
+        return self.elapsed
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def advance_to(self, moment):
+        if moment > self.elapsed:
+            self.elapsed = moment
+
+
+class PacedTask:
+    """یک دسته عملیات که بین گام‌هایش به جای sleep تأخیر را yield می‌کند"""
+
+    def __init__(self, steps, on_done=None):
+        self.steps = steps
+        self.on_done = on_done
+        # لاگ‌های هر گام با context همان جایی که دسته شروع شده نوشته می‌شوند
+        self.context = logs.log_context.get()
+        self.result = None
+        self.error = None
+        self.finished = threading.Event()
+
+    def wait(self, timeout=None):
+        self.finished.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class Pacer:
+    """زمان‌بند غیرمسدودکننده بر پایه صف اولویت
+
+    هر دسته یک ژنراتور است که بعد از هر عملیات تأخیر بعدی را (به ثانیه)
+    yield می‌کند و در پایان نتیجه را return می‌کند. یک کارگر همه دسته‌ها را
+    به نوبت جلو می‌برد و هر دسته فقط وقتی تأخیرش تمام شد ادامه پیدا می‌کند.
+
+    با VirtualClock هیچ نخی ساخته نمی‌شود و advance() زمان را جلو می‌برد
+    (benchmarks/virtual_day.py یک روز کامل کارهای زمان‌بندی شده را این‌طور اجرا می‌کند):
+
+        pacer = Pacer(VirtualClock())
+        pacer.every(4 * 3600, lambda: bot.reply_to_followers_stories_steps(3))
+        pacer.advance(24 * 3600)
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or RealClock()
+        self.virtual = isinstance(self.clock, VirtualClock)
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.worker = None
+
+    def spawn(self, steps, on_done=None, delay=0):
+        """شروع یک دسته بدون منتظر ماندن برای پایان آن"""
+        task = PacedTask(steps, on_done)
+        self._push(self.clock.now() + delay, task)
+        return task
+
+    def run(self, steps):
+        """اجرای یک دسته و منتظر ماندن تا پایان آن"""
+        task = self.spawn(steps)
+        if self.virtual:
+            while not task.finished.is_set() and self._run_next():
+                pass
+        return task.wait()
+
+    def call_later(self, delay, func):
+        """اجرای یک تابع (یا شروع دسته‌ای که برمی‌گرداند) بعد از delay ثانیه"""
+        return self.spawn(self._call(func), delay=delay)
+
+    def every(self, interval, func):
+        """اجرای دوره‌ای یک تابع یا دسته، هر interval ثانیه یک بار"""
+        def repeat():
+            while True:
+                yield interval
+                self.spawn(self._call(func))
+        return self.spawn(repeat())
+
+    def _call(self, func):
+        result = func()
+        if hasattr(result, "send"):
+            result = yield from result
+        return result
+
+    def advance(self, seconds):
+        """جلو بردن ساعت مجازی و اجرای همه گام‌هایی که در این بازه سررسید می‌شوند"""
+        deadline = self.clock.now() + seconds
+        while self.queue and self.queue[0][0] <= deadline:
+            self._run_next()
+        self.clock.advance_to(deadline)
+
+    def pending(self):
+        with self.condition:
+            return len(self.queue)
+
+    def _push(self, due, task):
+        with self.condition:
+            heapq.heappush(self.queue, (due, next(self.counter), task))
+            if not self.virtual:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self._loop, name="pacer", daemon=True)
+                    self.worker.start()
+                self.condition.notify()
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                while not self.queue or self.queue[0][0] > self.clock.now():
+                    timeout = self.queue[0][0] - self.clock.now() if self.queue else None
+                    self.condition.wait(timeout)
+                _, _, task = heapq.heappop(self.queue)
+            self._step(task)
+
+    def _run_next(self):
+        with self.condition:
+            if not self.queue:
+                return False
+            due, _, task = heapq.heappop(self.queue)
+        self.clock.advance_to(due)
+        self._step(task)
+        return True
+
+    def _step(self, task):
+        try:
+            with logs.bind(**task.context):
+                delay = next(task.steps)
+        except StopIteration as stop:
+            task.result = stop.value
+            self._finish(task)
+            return
+        except Exception as e:
+            task.error = e
+            self._finish(task)
+            return
+        if delay:
+            metrics.PACING_SECONDS.inc(delay)
+        self._push(self.clock.now() + (delay or 0), task)
+
+    def _finish(self, task):
+        task.finished.set()
+        if task.on_done:
+            try:
+                task.on_done(task)
+            except Exception as e:
+                log.warning(f"⚠️ خطا در پایان دسته: {str(e)}")
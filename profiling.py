@@ -0,0 +1,175 @@
+import cProfile
+import functools
+import logging
+import os
+import re
+import threading
+import tracemalloc
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+
+class Profiler:
+    """پروفایل cProfile روی route یا کار انتخاب شده که در زمان اجرا روشن می‌شود
+
+    وقتی چیزی انتخاب نشده هیچ هزینه‌ای ندارد: view یک route فقط هنگام روشن
+    شدن در app.view_functions با نسخه پروفایل شده جایگزین می‌شود و برای
+    کارها JobManager.profiler فقط تا وقتی کاری انتخاب شده مقدار دارد. هر
+    اجرا در یک فایل .prof در directory نوشته می‌شود (با snakeviz یا pstats
+    خوانده می‌شود) و فقط keep فایل آخر نگه داشته می‌شود.
+    """
+
+    def __init__(self, directory='profiles', keep=50):
+        self.directory = directory
+        self.keep = keep
+        self.routes = {}
+        self.jobs = set()
+        # cProfile در هر لحظه فقط یک پروفایل فعال را می‌پذیرد
+        self.busy = threading.Lock()
+
+    def enable_route(self, app, endpoint):
+        if endpoint in self.routes:
+            return
+        view = app.view_functions[endpoint]
+        self.routes[endpoint] = view
+        app.view_functions[endpoint] = functools.wraps(view)(
+            lambda *args, **kwargs: self.call("route", endpoint, view, *args, **kwargs)
+        )
+
+    def disable_route(self, app, endpoint):
+        view = self.routes.pop(endpoint, None)
+        if view is not None:
+            app.view_functions[endpoint] = view
+
+    def wrap_job(self, name, func):
+        """func کار name، یا نسخه پروفایل شده آن اگر name انتخاب شده باشد"""
+        if name not in self.jobs:
+            return func
+        return functools.partial(self.call, "job", name, func)
+
+    def call(self, kind, name, func, *args, **kwargs):
+        if not self.busy.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profile.disable()
+        except BaseException:
+            self.busy.release()
+            raise
+        self.busy.release()
+        if hasattr(result, "send"):
+            return self._steps(kind, name, result, profile)
+        self.dump(kind, name, profile)
+        return result
+
+    def _steps(self, kind, name, steps, profile):
+        """پروفایل فقط گام‌های دسته؛ تأخیرهای بین گام‌ها شمرده نمی‌شوند"""
+        try:
+            while True:
+                # اگر همزمان route دیگری پروفایل می‌شود این گام بدون پروفایل اجرا می‌شود
+                profiled = self.busy.acquire(blocking=False)
+                if profiled:
+                    profile.enable()
+                try:
+                    delay = next(steps)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    if profiled:
+                        profile.disable()
+                        self.busy.release()
+                yield delay
+        finally:
+            self.dump(kind, name, profile)
+
+    def dump(self, kind, name, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        path = os.path.join(self.directory, f"{kind}-{safe_name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}.prof")
+        try:
+            profile.dump_stats(path)
+        except Exception as e:
+            log.warning(f"⚠️ پروفایل {name} نوشته نشد: {str(e)}")
+            return None
+        log.info(f"🔬 پروفایل {kind} {name} در {path} نوشته شد", extra={"target": name})
+        for old in self.files()[self.keep:]:
+            os.remove(os.path.join(self.directory, old))
+        return path
+
+    def files(self):
+        """فایل‌های پروفایل، جدیدترین اول"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory) if name.endswith('.prof')]
+        return sorted(names, key=lambda name: os.path.getmtime(os.path.join(self.directory, name)), reverse=True)
+
+
+class MemoryTracker:
+    """snapshotهای tracemalloc و مقایسه با baseline برای پیدا کردن نشت حافظه
+
+    tracemalloc تا start صدا زده نشود خاموش است و هزینه‌ای ندارد؛ با روشن
+    بودن هر تخصیص حافظه کندتر می‌شود، پس بعد از بررسی باید stop شود.
+    """
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self):
+        self.baseline = None
+        self.lock = threading.Lock()
+
+    def start(self, frames=10):
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = self._snapshot()
+
+    def stop(self):
+        with self.lock:
+            tracemalloc.stop()
+            self.baseline = None
+
+    def reset_baseline(self):
+        with self.lock:
+            if tracemalloc.is_tracing():
+                self.baseline = self._snapshot()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def report(self, limit=20, key_type='lineno'):
+        """بیشترین تخصیص‌های فعلی و بیشترین رشد نسبت به baseline"""
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                return {"tracing": False}
+            snapshot = self._snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            top = snapshot.statistics(key_type)[:limit]
+            diff = snapshot.compare_to(self.baseline, key_type)[:limit] if self.baseline else []
+        return {
+            "tracing": True,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                {"location": self._location(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in top
+            ],
+            "diff": [
+                {"location": self._location(stat.traceback), "size_diff": stat.size_diff,
+                 "count_diff": stat.count_diff, "size": stat.size}
+                for stat in diff
+            ]
+        }
+
+    @staticmethod
+    def _location(traceback):
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    action TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (action, bucket)
+);
+"""
+
+
+class Reservation:
+    """سهمیه رزرو شده برای یک دسته؛ هر عملیات موفق با consume ثبت می‌شود
+    و باقی‌مانده استفاده نشده با release برمی‌گردد."""
+
+    def __init__(self, ledger, action, granted):
+        self.ledger = ledger
+        self.action = action
+        self.granted = granted
+        self.remaining = granted
+
+    def consume(self):
+        self.remaining -= 1
+        self.ledger._consume(self.action)
+
+    def release(self):
+        if self.remaining:
+            self.ledger._release(self.action, self.remaining)
+            self.remaining = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class QuotaLedger:
+    """شمارش عملیات هر نوع (فالو، آنفالو، کامنت) در پنجره غلتان ۲۴ ساعته
+
+    پنجره به سطل‌های bucket_seconds ثانیه‌ای تقسیم می‌شود؛ برای هر نوع یک صف
+    از سطل‌ها و جمع کل نگه داشته می‌شود، پس بررسی و ثبت O(1) است. شمارش‌ها
+    در SQLite ذخیره می‌شوند تا بعد از ری‌استارت سهمیه از نو شروع نشود.
+    سطلی که بخشی از آن داخل پنجره است کامل حساب می‌شود (محافظه‌کارانه).
+    """
+
+    def __init__(self, db, limits, window=86400, bucket_seconds=300, clock=time.time):
+        self.db = db
+        self.limits = limits
+        self.window_buckets = window // bucket_seconds
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.totals = {}
+        self.reserved = {}
+        self.db.executescript(SCHEMA)
+
+        oldest = self._bucket() - self.window_buckets
+        self.db.execute("DELETE FROM quota_usage WHERE bucket <= ?", (oldest,))
+        for action, bucket, count in self.db.query(
+            "SELECT action, bucket, count FROM quota_usage ORDER BY bucket"
+        ):
+            self.buckets.setdefault(action, deque()).append([bucket, count])
+            self.totals[action] = self.totals.get(action, 0) + count
+
+    def _bucket(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def _expire(self, action, bucket):
+        buckets = self.buckets.get(action)
+        oldest = bucket - self.window_buckets
+        expired = False
+        while buckets and buckets[0][0] <= oldest:
+            self.totals[action] -= buckets.popleft()[1]
+            expired = True
+        if expired:
+            self.db.execute("DELETE FROM quota_usage WHERE action = ? AND bucket <= ?", (action, oldest))
+
+    def used(self, action):
+        with self.lock:
+            self._expire(action, self._bucket())
+            return self.totals.get(action, 0)
+
+    def remaining(self, action):
+        """سهمیه باقی‌مانده با کم کردن رزروهای دسته‌های در حال اجرا"""
+        with self.lock:
+            self._expire(action, self._bucket())
+            used = self.totals.get(action, 0) + self.reserved.get(action, 0)
+            return max(0, self.limits(action) - used)
+
+    def reserve(self, action, count):
+        """رزرو حداکثر count عملیات؛ دسته با granted کوچک‌تر اجرا می‌شود"""
+        with self.lock:
+            self._expire(action, self._bucket())
+            used = self.totals.get(action, 0) + self.reserved.get(action, 0)
+            granted = max(0, min(int(count), self.limits(action) - used))
+            self.reserved[action] = self.reserved.get(action, 0) + granted
+        return Reservation(self, action, granted)
+
+    def _consume(self, action):
+        bucket = self._bucket()
+        with self.lock:
+            self.reserved[action] -= 1
+            self._expire(action, bucket)
+            buckets = self.buckets.setdefault(action, deque())
+            if buckets and buckets[-1][0] == bucket:
+                buckets[-1][1] += 1
+            else:
+                buckets.append([bucket, 1])
+            self.totals[action] = self.totals.get(action, 0) + 1
+            self.db.execute(
+                "INSERT INTO quota_usage VALUES (?, ?, 1) ON CONFLICT(action, bucket) DO UPDATE SET count = count + 1",
+                (action, bucket)
+            )
+
+    def _release(self, action, count):
+        with self.lock:
+            self.reserved[action] -= count
+
+    def summary(self, actions):
+        return {
+            action: {
+                "limit": self.limits(action),
+                "used": self.used(action),
+                "remaining": self.remaining(action)
+            }
+            for action in actions
+        }
@@ -0,0 +1,132 @@
+import logging
+import pickle
+import sqlite3
+from datetime import time as dtime
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_next_run_time ON scheduler_jobs (next_run_time);
+"""
+
+# کارهای ذخیره شده فقط نام کار را نگه می‌دارند؛ متد bound ربات قابل pickle نیست
+_handler = None
+
+
+def set_handler(handler):
+    """ثبت تابعی که کارهای زمان‌بندی شده با نام کار به آن سپرده می‌شوند"""
+    global _handler
+    _handler = handler
+
+
+def run_task(name):
+    if _handler is None:
+        log.warning(f"⚠️ کار زمان‌بندی شده {name} اجرا نشد: ربات آماده نیست")
+        return
+    _handler(name)
+
+
+def within_hours(now, start, end):
+    """آیا ساعت now در بازه start تا end (مثل "09:00") است؟ بازه‌های شبانه هم پشتیبانی می‌شوند"""
+    start, end = dtime.fromisoformat(start), dtime.fromisoformat(end)
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class SQLiteJobStore(BaseJobStore):
+    """انبار کارهای APScheduler در همان پایگاه داده SQLite ربات
+
+    همان رفتار SQLAlchemyJobStore، بدون وابستگی به SQLAlchemy. کارها با شناسه
+    ثابت ذخیره می‌شوند و زمان اجرای بعدی بعد از ری‌استارت حفظ می‌شود.
+    """
+
+    def __init__(self, db, pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.db = db
+        self.pickle_protocol = pickle_protocol
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self.db.executescript(SCHEMA)
+
+    def lookup_job(self, job_id):
+        rows = self.db.query("SELECT job_state FROM scheduler_jobs WHERE id = ?", (job_id,))
+        return self._reconstitute_job(rows[0][0]) if rows else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        rows = self.db.query(
+            "SELECT next_run_time FROM scheduler_jobs WHERE next_run_time IS NOT NULL "
+            "ORDER BY next_run_time LIMIT 1"
+        )
+        return utc_timestamp_to_datetime(rows[0][0]) if rows else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            self.db.execute(
+                "INSERT INTO scheduler_jobs VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job))
+            )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        cursor = self.db.execute(
+            "UPDATE scheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id)
+        )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        cursor = self.db.execute("DELETE FROM scheduler_jobs WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        self.db.execute("DELETE FROM scheduler_jobs")
+
+    def _dump(self, job):
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where="", params=()):
+        jobs = []
+        failed_job_ids = []
+        rows = self.db.query(f"SELECT id, job_state FROM scheduler_jobs {where} ORDER BY next_run_time", params)
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                failed_job_ids.append(job_id)
+
+        for job_id in failed_job_ids:
+            self.db.execute("DELETE FROM scheduler_jobs WHERE id = ?", (job_id,))
+        return jobs
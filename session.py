@@ -0,0 +1,30 @@
+import json
+import os
+
+from storage import atomic_write_json
+
+
+class SessionStore:
+    """ذخیره نشست instagrapi روی دیسک تا بعد از ری‌استارت ورود کامل لازم نباشد
+
+    فایل فقط برای مالک قابل خواندن است (0600) چون کوکی‌های نشست را دارد.
+    """
+
+    def __init__(self, path='session.json'):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, username, settings):
+        atomic_write_json(self.path, {"username": username, "settings": settings}, mode=0o600)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
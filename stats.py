@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+
+class StatsCache:
+    """کش آمار حساب با روش stale-while-revalidate
+
+    آخرین تعداد فالوور و فالوینگ بلافاصله برگردانده می‌شود و اگر قدیمی‌تر از
+    ttl باشد در پس‌زمینه دوباره از اینستاگرام گرفته می‌شود. آمارهای محلی
+    (که از دفتر فالوها محاسبه می‌شوند) تا تغییر بعدی دفتر نگه داشته می‌شوند.
+    """
+
+    def __init__(self, fetch, ttl=300, clock=time.time):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.account = None
+        self.fetched_at = None
+        self.refreshing = False
+        self.local = None
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def get_account(self):
+        """آخرین اطلاعات حساب، بدون منتظر ماندن برای شبکه"""
+        with self.lock:
+            stale = self.fetched_at is None or self.clock() - self.fetched_at >= self.ttl
+            if stale and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self._refresh, name="stats-refresh", daemon=True).start()
+            return self.account
+
+    def _refresh(self):
+        try:
+            user_info = self.fetch()
+            account = {
+                "username": user_info.username,
+                "follower_count": user_info.follower_count,
+                "following_count": user_info.following_count
+            }
+            with self.lock:
+                self.account = account
+                self.fetched_at = self.clock()
+            for listener in self.listeners:
+                listener(account)
+        except Exception as e:
+            log.warning(f"⚠️ خطا در دریافت آمار: {str(e)}")
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def subscribe(self, listener):
+        """ثبت تابعی که بعد از هر دریافت تازه اطلاعات حساب صدا زده می‌شود"""
+        self.listeners.append(listener)
+
+    def get_local(self, compute):
+        with self.lock:
+            local, generation = self.local, self.generation
+        if local is None:
+            local = compute()
+            with self.lock:
+                # اگر در حین محاسبه دفتر تغییر کرده، نتیجه کش نمی‌شود
+                if generation == self.generation:
+                    self.local = local
+        return local
+
+    def invalidate_local(self, *args):
+        with self.lock:
+            self.local = None
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.account = None
+            self.fetched_at = None
+            self.local = None
+            self.generation += 1
+
+    def fetched_at_iso(self):
+        return datetime.fromtimestamp(self.fetched_at).isoformat() if self.fetched_at else None
@@ -0,0 +1,96 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def atomic_write_json(path, data, mode=None):
+    """نوشتن JSON در فایل موقت و جایگزینی با rename تا فایل هرگز نیمه‌کاره نماند"""
+    tmp_path = path + '.tmp'
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    fd = os.open(tmp_path, flags, 0o666 if mode is None else mode)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    if mode is not None:
+        os.chmod(tmp_path, mode)
+    os.replace(tmp_path, path)
+
+
+class Database:
+    """پایگاه داده SQLite مشترک بین نخ‌های وب و زمان‌بند"""
+
+    def __init__(self, path='bot.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.RLock()
+        self.committed = []
+
+    @contextmanager
+    def transaction(self):
+        """اجرای چند دستور به صورت اتمی؛ در صورت خطا هیچ‌کدام ثبت نمی‌شود
+
+        تراکنش تو در تو در همین نخ به تراکنش بیرونی می‌پیوندد و با آن ثبت یا
+        لغو می‌شود. توابع ثبت شده با after_commit بعد از COMMIT بیرونی‌ترین
+        تراکنش و بیرون از قفل اجرا می‌شوند.
+        """
+        with self.lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.committed = []
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            callbacks, self.committed = self.committed, []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback):
+        """اجرای callback بعد از ثبت تراکنش جاری؛ با ROLLBACK دور ریخته می‌شود
+
+        فقط داخل transaction() صدا زده می‌شود.
+        """
+        self.committed.append(callback)
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def executescript(self, script):
+        with self.lock:
+            self.conn.executescript(script)
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def sync(self):
+        """fsync فایل WAL تا تراکنش‌های ثبت شده بعد از قطع برق هم بمانند
+
+        با synchronous=NORMAL هر COMMIT جدا fsync نمی‌شود؛ این متد بعد از
+        چند تراکنش یک بار صدا زده می‌شود (group commit).
+        """
+        if self.path == ':memory:':
+            return
+        with self.lock:
+            try:
+                fd = os.open(self.path + '-wal', os.O_RDONLY)
+            except FileNotFoundError:
+                return
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
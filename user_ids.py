@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_ids (
+    username TEXT PRIMARY KEY,
+    pk TEXT NOT NULL,
+    resolved_at REAL NOT NULL
+);
+"""
+
+
+def normalize_username(username):
+    """نام کاربری اینستاگرام به حروف کوچک و بدون @ و فاصله"""
+    return username.strip().lstrip('@').lower()
+
+
+class UserIdCache:
+    """کش نام کاربری به pk که بین ری‌استارت‌ها در SQLite می‌ماند
+
+    pk یک حساب تقریبا هرگز عوض نمی‌شود، پس ttl طولانی است؛ اگر جستجو یا
+    درخواستی که با pk کش شده انجام شده شکست بخورد، ورودی با invalidate حذف
+    می‌شود تا دفعه بعد دوباره گرفته شود.
+    """
+
+    def __init__(self, db, resolve, ttl=30 * 86400, clock=time.time):
+        self.db = db
+        self.resolve = resolve
+        self.ttl = ttl
+        self.clock = clock
+        self.db.executescript(SCHEMA)
+        self.entries = {row[0]: (row[1], row[2]) for row in self.db.query("SELECT username, pk, resolved_at FROM user_ids")}
+
+    def get(self, username):
+        key = normalize_username(username)
+        entry = self.entries.get(key)
+        if entry is not None and self.clock() - entry[1] < self.ttl:
+            return entry[0]
+
+        try:
+            pk = str(self.resolve(key))
+        except Exception:
+            self.invalidate(key)
+            raise
+        resolved_at = self.clock()
+        self.db.execute(
+            "INSERT INTO user_ids VALUES (?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+            "pk = excluded.pk, resolved_at = excluded.resolved_at",
+            (key, pk, resolved_at)
+        )
+        self.entries[key] = (pk, resolved_at)
+        return pk
+
+    def invalidate(self, username):
+        key = normalize_username(username)
+        if self.entries.pop(key, None) is not None:
+            self.db.execute("DELETE FROM user_ids WHERE username = ?", (key,))
+
+    def warm(self, usernames):
+        """گرفتن pk نام‌های جدید در پس‌زمینه تا اولین دسته منتظر شبکه نماند"""
+        missing = [name for name in usernames if normalize_username(name) not in self.entries]
+        if not missing:
+            return None
+
+        def run():
+            resolved = 0
+            for username in missing:
+                try:
+                    self.get(username)
+                    resolved += 1
+                except Exception as e:
+                    log.warning(f"⚠️ pk حساب {username} گرفته نشد: {str(e)}", extra={"target": username})
+                    break
+            if resolved:
+                log.info(f"🔎 pk {resolved} حساب هدف در کش ذخیره شد")
+
+        thread = threading.Thread(target=run, name="user-ids-warmup", daemon=True)
+        thread.start()
+        return thread